@@ -0,0 +1,65 @@
+"""
+Adaptive concurrency benchmark against a mock API that answers 429 beyond ``--capacity`` requests in flight.
+
+Every listing request is retried after 0.2s until it succeeds. "fixed" pins the in-flight limit at
+``--concurrency``, "adaptive" starts there and lets the AIMD limiter find the sustainable level.
+Run from the repository root:  python bench/bench_aimd.py --requests 3000 --capacity 12 --concurrency 64
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+from quark import QuarkPanFileManager  # noqa: E402
+
+
+async def run_requests(manager: QuarkPanFileManager, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    url = f'{manager.api_host}/1/clouddrive/file/sort'
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            while (await manager._request('GET', url, params={'pdir_fid': '0', '_page': 1})).status_code == 429:
+                await asyncio.sleep(0.2)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await manager.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--capacity', type=int, default=12)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per request')
+    args = parser.parse_args()
+
+    with MockQuarkServer(files=20, latency=args.latency) as server:
+        server.capacity = args.capacity
+        for label, max_limit in (('fixed', args.concurrency), ('adaptive', 256)):
+            manager = make_manager(server, api_concurrency=args.concurrency, api_max_concurrency=max_limit)
+            if label == 'fixed':
+                manager.api_limiter.on_success = manager.api_limiter.on_congestion = lambda *_: None
+            throttled = server.throttled
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log):
+                elapsed = asyncio.run(run_requests(manager, args.requests, args.concurrency))
+            print(f'{label:>8}: {elapsed:6.2f}s  {args.requests / elapsed:7.1f} req/s  '
+                  f'{server.throttled - throttled} x 429  final limit {int(manager.api_limiter.limit)}')
+        print('last limiter decisions:')
+        for line in log.getvalue().splitlines()[-5:]:
+            print('  ' + line)
+
+
+if __name__ == '__main__':
+    main()
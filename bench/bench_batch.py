@@ -0,0 +1,52 @@
+"""
+Batch transfer benchmark: the old one-link-at-a-time loop against QuarkPanFileManager.batch_run.
+
+Run from the repository root:  python bench/bench_batch.py --links 100 --concurrency 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+from quark import QuarkPanFileManager  # noqa: E402
+
+
+async def sequential(manager: QuarkPanFileManager, urls: list[str]) -> None:
+    for url in urls:
+        await manager.run(url, '0')
+
+
+async def timed(manager: QuarkPanFileManager, coro) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await coro
+    elapsed = time.perf_counter() - start
+    await manager.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per request')
+    args = parser.parse_args()
+
+    with MockQuarkServer(files=10, latency=args.latency) as server:
+        urls = [f'https://pan.quark.cn/s/mock{i:06d}' for i in range(args.links)]
+        for label, concurrency in (('sequential', 0), (f'batch_run x{args.concurrency}', args.concurrency)):
+            manager = make_manager(server, use_journal=False)
+            coro = manager.batch_run(urls, '0', concurrency) if concurrency else sequential(manager, urls)
+            elapsed = asyncio.run(timed(manager, coro))
+            print(f'{label:>16}: {elapsed:7.2f}s  {args.links / elapsed:6.1f} links/s')
+
+
+if __name__ == '__main__':
+    main()
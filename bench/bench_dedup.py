@@ -0,0 +1,59 @@
+"""
+Overlapping batch benchmark: --links links to the same share of --files files, saved into a drive folder that
+already holds --existing of those files, with and without skipping existing entries.
+
+Reports the save requests and the entries saved (duplicates included) as counted by the mock server.
+Run from the repository root:  python bench/bench_dedup.py --links 50 --files 200 --existing 100
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+
+
+async def batch(server: MockQuarkServer, urls: list[str], skip_existing: bool, concurrency: int) -> float:
+    manager = make_manager(server, use_journal=False, skip_existing=skip_existing)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            await manager.batch_run(urls, 'save', concurrency)
+        finally:
+            await manager.close()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=50)
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--existing', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per request')
+    args = parser.parse_args()
+
+    urls = [f'https://pan.quark.cn/s/mock{i:06d}' for i in range(args.links)]
+    cwd = os.getcwd()
+    for skip_existing in (False, True):
+        with MockQuarkServer(files=args.files, latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+            server.drive['save'] = server.children('0')[:args.existing]
+            os.chdir(tmp)
+            try:
+                elapsed = asyncio.run(batch(server, urls, skip_existing, args.concurrency))
+            finally:
+                os.chdir(cwd)
+            label = 'skip existing' if skip_existing else 'save all'
+            print(f'{label:>13}: {elapsed:6.2f}s  {server.saves:4d} saves  {server.saved_items:6d} entries saved  '
+                  f'{len(server.drive["save"])} entries in the folder  {server.requests} requests')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Single-stream vs segmented download of one large file from the mock server.
+
+The server throttles every connection to --bandwidth bytes/s, like a CDN throttling one stream.
+Run from the repository root:  python bench/bench_download.py --size-mb 64 --segments 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer, file_bytes  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+from quark import QuarkPanFileManager  # noqa: E402
+
+
+async def download(manager: QuarkPanFileManager, url: str, save_path: str) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stderr(io.StringIO()):
+        await manager.download_file(url, save_path, headers={})
+    elapsed = time.perf_counter() - start
+    await manager.close()
+    return elapsed
+
+
+def verify(save_path: str, size: int) -> bool:
+    with open(save_path, 'rb') as f:
+        for offset in range(0, size, 8 * 1024 * 1024):
+            block = f.read(8 * 1024 * 1024)
+            if block != file_bytes(offset, len(block)):
+                return False
+        return f.tell() == size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=64)
+    parser.add_argument('--segments', type=int, default=4)
+    parser.add_argument('--min-segment-mb', type=int, default=4)
+    parser.add_argument('--bandwidth', type=float, default=32 * 1024 * 1024, help='bytes/s per connection')
+    parser.add_argument('--no-ranges', action='store_true', help='server ignores Range (fallback path)')
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    with MockQuarkServer(bandwidth=args.bandwidth, ranges=not args.no_ranges) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        url = f'{server.base_url}/dl/big?size={size}'
+        for label, segments in (('single stream', 1), (f'{args.segments} segments', args.segments)):
+            manager = make_manager(server, download_segments=segments,
+                                   min_segment_size=args.min_segment_mb * 1024 * 1024)
+            save_path = os.path.join(tmp, f'{segments}.bin')
+            elapsed = asyncio.run(download(manager, url, save_path))
+            print(f'{label:>14}: {elapsed:6.2f}s  {size / elapsed / 1024 / 1024:7.1f} MiB/s  '
+                  f'verified={verify(save_path, size)}')
+
+
+if __name__ == '__main__':
+    main()
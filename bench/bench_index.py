@@ -0,0 +1,105 @@
+"""
+Drive index benchmark: index a generated drive of --depth levels with --dirs subfolders and --files files per
+folder, time name and path lookups against it, then change --changes folders and refresh the index again.
+
+The mock server bumps the updated_at of each changed folder and of the folders above it. Reports the build time
+and requests, the p50/p99 latency of each kind of lookup, and the requests of an incremental refresh next to
+those of a full walk. Run from the repository root:  python bench/bench_index.py --depth 4 --dirs 8 --files 40
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+
+
+async def refresh(server: MockQuarkServer, workers: int, full: bool = False) -> tuple[float, int, dict[str, int]]:
+    manager = make_manager(server, use_journal=False, drive_index_concurrency=workers)
+    requests = server.requests
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            stats = await manager.refresh_drive_index(full=full)
+        finally:
+            await manager.close()
+    return time.perf_counter() - start, server.requests - requests, stats
+
+
+def percentiles(lookup: Callable[[Any], Any], inputs: list[Any]) -> tuple[float, float]:
+    timings = []
+    for value in inputs:
+        start = time.perf_counter()
+        lookup(value)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1e6, timings[int(len(timings) * 0.99)] * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--dirs', type=int, default=10)
+    parser.add_argument('--files', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=4, help='folders listed concurrently')
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--changes', type=int, default=5, help='folders changed before the incremental refresh')
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds per request')
+    args = parser.parse_args()
+
+    random.seed(1)
+    cwd = os.getcwd()
+    with MockQuarkServer(tree=(args.depth, args.dirs, args.files), latency=args.latency) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            elapsed, requests, stats = asyncio.run(refresh(server, args.workers))
+            manager = make_manager(server)
+            index, account = manager.drive_index, manager.account_key
+            entries = index.count(account)
+            print(f'   build: {elapsed:6.2f}s  {requests:6d} requests  {stats["listed"]} folders  {entries} entries  '
+                  f'{os.path.getsize(index.path) / 1024 ** 2:.1f} MiB')
+
+            rows = [dict(row) for row in index.db.execute('SELECT fid, name FROM entries WHERE account = ?',
+                                                           (account,))]
+            sample = random.choices(rows, k=args.queries)
+            paths = [index.path_of(account, row['fid']) for row in sample]
+            lookups = {
+                'prefix': (lambda name: index.search(account, name, prefix=True, limit=20),
+                           [row['name'][:4] for row in sample]),
+                'substring': (lambda name: index.search(account, name, limit=20),
+                              [row['name'][2:7] for row in sample]),
+                'path': (lambda path: index.resolve(account, path), paths),
+                'path of fid': (lambda fid: index.path_of(account, fid), [row['fid'] for row in sample]),
+            }
+            for name, (lookup, inputs) in lookups.items():
+                p50, p99 = percentiles(lookup, inputs)
+                print(f'{name:>11}: p50 {p50:7.1f}us  p99 {p99:7.1f}us')
+            manager.drive_index.close()
+
+            folders = [row['fid'] for row in rows if row['fid'].startswith('d')]
+            for k, fid in enumerate(random.sample(folders, min(args.changes, len(folders)))):
+                server.drive[fid] = server.children(fid) + [f'fnew{k}']
+                while fid != '0':
+                    server.updated[fid] = server.updated.get(fid, 1700000000000) + 1
+                    fid = server.parent_of(fid)
+            for full in (False, True):
+                elapsed, requests, stats = asyncio.run(refresh(server, args.workers, full))
+                label = 'full walk' if full else 'incremental'
+                print(f'{label:>11}: {elapsed:6.2f}s  {requests:6d} requests  {stats["listed"]} folders listed  '
+                      f'{stats["unchanged"]} unchanged')
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Interrupted batch transfer benchmark: batch_run is cancelled part-way, as if the program crashed, and run again.
+
+Without the journal the re-run saves every link again; with it, finished links are skipped and links whose save
+task was already submitted are resumed by polling. Reports the save requests sent to the mock server and the
+time and requests of the re-run. Run from the repository root:  python bench/bench_journal.py --links 200
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+
+
+async def batch(server: MockQuarkServer, urls: list[str], use_journal: bool, concurrency: int,
+                stop_after: float = 0.0) -> None:
+    manager = make_manager(server, use_journal=use_journal)
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            if stop_after:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(manager.batch_run(urls, '0', concurrency), stop_after)
+            else:
+                await manager.batch_run(urls, '0', concurrency)
+        finally:
+            await manager.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per request')
+    parser.add_argument('--task-duration', type=float, default=2.0, help='seconds until a save task ends')
+    parser.add_argument('--stop-after', type=float, default=10.0, help='seconds before the first run is cancelled')
+    args = parser.parse_args()
+
+    urls = [f'https://pan.quark.cn/s/mock{i:06d}' for i in range(args.links)]
+    cwd = os.getcwd()
+    for use_journal in (False, True):
+        with MockQuarkServer(files=10, latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                server.task_duration = args.task_duration
+                asyncio.run(batch(server, urls, use_journal, args.concurrency, args.stop_after))
+                saves, requests = server.saves, server.requests
+                start = time.perf_counter()
+                asyncio.run(batch(server, urls, use_journal, args.concurrency))
+                elapsed = time.perf_counter() - start
+            finally:
+                os.chdir(cwd)
+            label = 'journal' if use_journal else 'no journal'
+            print(f'{label:>10}: {saves} saves before the crash, {server.saves - saves} in the re-run '
+                  f'({server.saves} for {args.links} links); re-run {elapsed:6.2f}s, '
+                  f'{server.requests - requests} requests')
+
+
+if __name__ == '__main__':
+    main()
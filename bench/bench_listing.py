@@ -0,0 +1,46 @@
+"""
+Listing benchmark: get_detail / list_dir over a large share, serial pages against concurrent page fan-out.
+
+Run from the repository root:  python bench/bench_listing.py --entries 20000 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+from quark import QuarkPanFileManager  # noqa: E402
+
+
+async def list_share(manager: QuarkPanFileManager) -> tuple[float, int, int]:
+    start = time.perf_counter()
+    _, detail = await manager.get_detail('pwd', 'stoken')
+    entries = await manager.list_dir('0')
+    elapsed = time.perf_counter() - start
+    await manager.close()
+    return elapsed, len(detail), len(entries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per request')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--page-concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    with MockQuarkServer(files=args.entries, latency=args.latency) as server:
+        for label, page_size, concurrency in (('serial, 50/page', 50, 1),
+                                              (f'fan-out x{args.page_concurrency}, {args.page_size}/page',
+                                               args.page_size, args.page_concurrency)):
+            manager = make_manager(server, page_size=page_size, page_concurrency=concurrency)
+            elapsed, detail, entries = asyncio.run(list_share(manager))
+            print(f'{label:>26}: {elapsed:6.2f}s  detail={detail} list_dir={entries}')
+
+
+if __name__ == '__main__':
+    main()
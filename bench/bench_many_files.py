@@ -0,0 +1,51 @@
+"""
+Many-small-files download benchmark for QuarkPanFileManager.quark_file_download at several concurrency levels.
+
+Run from the repository root:  python bench/bench_many_files.py --files 200 --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+from quark import QuarkPanFileManager  # noqa: E402
+
+
+async def download_all(manager: QuarkPanFileManager, fids: list[str]) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        await asyncio.gather(*(manager.quark_file_download(fids[offset:offset + 50])
+                               for offset in range(0, len(fids), 50)))
+    elapsed = time.perf_counter() - start
+    await manager.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--file-size', type=int, default=64 * 1024)
+    parser.add_argument('--latency', type=float, default=0.03, help='seconds per request')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    fids = [f'f{i:08d}' for i in range(args.files)]
+    with MockQuarkServer(files=args.files, file_size=args.file_size, latency=args.latency) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        for concurrency in args.concurrency:
+            manager = make_manager(server, download_concurrency=concurrency, max_connections=max(100, concurrency))
+            elapsed = asyncio.run(download_all(manager, fids))
+            print(f'concurrency {concurrency:>3}: {elapsed:6.2f}s  {args.files / elapsed:7.1f} files/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Before/after benchmark for the pooled client of QuarkPanFileManager.
+
+"before" opens a fresh httpx.AsyncClient per API call like the old code did, "after" uses the shared pool.
+Run from the repository root:  python bench/bench_pool.py --links 300 --handshake 0.03 --latency 0.01
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Union
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+from quark import QuarkPanFileManager  # noqa: E402
+
+
+def pool_manager(server: MockQuarkServer, pooled: bool, **kwargs) -> QuarkPanFileManager:
+    manager = make_manager(server, **kwargs)
+    if not pooled:
+        async def per_call_request(method: str, url: str, idempotent: Union[bool, None] = None,
+                                   **request_kwargs) -> httpx.Response:
+            async with httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=60.0)) as client:
+                return await client.request(method, url, **request_kwargs)
+
+        manager._request = per_call_request
+    return manager
+
+
+async def run_links(manager: QuarkPanFileManager, links: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            stoken = await manager.get_stoken(f'pwd{index}')
+            await manager.get_detail(f'pwd{index}', stoken)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(links)))
+    elapsed = time.perf_counter() - start
+    await manager.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=300)
+    parser.add_argument('--files', type=int, default=120, help='entries per share (pages of 50)')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.005, help='seconds per request')
+    parser.add_argument('--handshake', type=float, default=0.03, help='seconds per new connection')
+    args = parser.parse_args()
+
+    with MockQuarkServer(files=args.files, latency=args.latency, handshake=args.handshake) as server:
+        calls = args.links * (1 + -(-args.files // 50))
+        print(f'{args.links} links, {calls} API calls, concurrency {args.concurrency}, '
+              f'latency {args.latency * 1000:.0f}ms, handshake {args.handshake * 1000:.0f}ms')
+        for label, pooled in (('before (client per call)', False), ('after  (shared pool)', True)):
+            connections = server.connections
+            elapsed = asyncio.run(run_links(pool_manager(server, pooled), args.links, args.concurrency))
+            print(f'{label}: {elapsed:7.2f}s  {calls / elapsed:8.1f} req/s  '
+                  f'{server.connections - connections} connections')
+
+
+if __name__ == '__main__':
+    main()
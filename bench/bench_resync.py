@@ -0,0 +1,54 @@
+"""
+Incremental re-sync benchmark: downloads a generated share tree once, then downloads it again.
+
+The second run should request no download URLs and transfer no bytes, because the download manifest already
+records every file. Run from the repository root:  python bench/bench_resync.py --depth 3 --dirs 4 --files 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+from quark import QuarkPanFileManager  # noqa: E402
+
+
+async def download_share(manager: QuarkPanFileManager) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        await manager.run('https://pan.quark.cn/s/mocktree', '0', download=True)
+    elapsed = time.perf_counter() - start
+    await manager.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--dirs', type=int, default=4)
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.005, help='seconds per request')
+    parser.add_argument('--download-concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    with MockQuarkServer(tree=(args.depth, args.dirs, args.files), latency=args.latency) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        server.is_owner = 1
+        os.chdir(tmp)
+        for label, incremental in (('full download', True), ('re-sync', True), ('re-sync, no manifest', False)):
+            manager = make_manager(server, list_concurrency=16, download_concurrency=args.download_concurrency,
+                                   incremental_download=incremental)
+            requests = server.requests
+            elapsed = asyncio.run(download_share(manager))
+            print(f'{label:<22}: {elapsed:6.2f}s  {server.requests - requests} requests')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Retry benchmark: batch sharing against a mock API that fails transiently or permanently.
+
+"transient" answers ``--error-rate`` of all API requests with 503; "permanent" answers every share request with
+error 32003 (drive full), which the retry policy gives up on after one attempt.
+Run from the repository root:  python bench/bench_retry.py --dirs 6 --error-rate 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+from quark import QuarkPanFileManager  # noqa: E402
+
+
+async def share(manager: QuarkPanFileManager) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await manager.share_run('https://pan.quark.cn/s/0', '0', traverse_depth=2)
+    elapsed = time.perf_counter() - start
+    await manager.close()
+    return elapsed
+
+
+def count_lines(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding='utf-8') as f:
+        return sum(1 for line in f if line.strip())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dirs', type=int, default=6, help='folders per level, dirs**2 folders are shared')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per request')
+    parser.add_argument('--error-rate', type=float, default=0.2)
+    args = parser.parse_args()
+
+    with MockQuarkServer(tree=(2, args.dirs, 0), latency=args.latency) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        for label in ('transient', 'permanent'):
+            server.error_rate = args.error_rate if label == 'transient' else 0.0
+            server.error_codes = {'/1/clouddrive/share': 32003} if label == 'permanent' else {}
+            manager = make_manager(server, share_rate=0)
+            requests, failed = server.requests, server.failed
+            if os.path.exists('share/retry.txt'):
+                os.remove('share/retry.txt')
+            elapsed = asyncio.run(share(manager))
+            print(f'{label:>9}: {elapsed:6.2f}s  {count_lines("share/share_url.txt")} shared  '
+                  f'{count_lines("share/retry.txt")} to retry.txt  {server.requests - requests} requests, '
+                  f'{server.failed - failed} failed')
+
+
+if __name__ == '__main__':
+    main()
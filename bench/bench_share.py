@@ -0,0 +1,70 @@
+"""
+Batch share benchmark: the old one-folder-at-a-time share loop against share_run's rate-limited worker pool.
+
+Run from the repository root:  python bench/bench_share.py --dirs 8 --rate 20 --concurrency 16
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+from quark import QuarkPanFileManager  # noqa: E402
+
+
+async def sequential(manager: QuarkPanFileManager) -> None:
+    """The share loop before share_folders: a random 0.5-2s sleep in front of every folder."""
+    for i1 in await manager.list_dir('0'):
+        for i2 in await manager.list_dir(i1['fid']):
+            await asyncio.sleep(random.choice([0.5, 1, 1.5, 2]))
+            await manager.share_folder(i2['fid'], i2['file_name'])
+
+
+async def timed(manager: QuarkPanFileManager, coro) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await coro
+    elapsed = time.perf_counter() - start
+    await manager.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dirs', type=int, default=8, help='folders per level, dirs**2 folders are shared')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per request')
+    parser.add_argument('--task-duration', type=float, default=0.5, help='seconds until a share task finishes')
+    parser.add_argument('--rate', type=float, default=20.0, help='share links per second')
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    with MockQuarkServer(tree=(2, args.dirs, 0), latency=args.latency) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        server.task_duration = args.task_duration
+        os.chdir(tmp)
+        folders = args.dirs ** 2
+        for label in ('sequential', f'share_run x{args.concurrency} @{args.rate:g}/s'):
+            manager = make_manager(server, share_rate=args.rate, share_burst=args.concurrency,
+                                   share_concurrency=args.concurrency)
+            if label == 'sequential':
+                coro = sequential(manager)
+            else:
+                coro = manager.share_run('https://pan.quark.cn/s/0', '0', traverse_depth=2)
+            elapsed = asyncio.run(timed(manager, coro))
+            print(f'{label:>24}: {elapsed:7.2f}s  {folders / elapsed:6.1f} folders/s')
+        with open('share/share_url.txt', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        ordered = [int(line.split(' | ')[0]) for line in lines] == list(range(1, len(lines) + 1))
+        print(f'share_url.txt: {len(lines)} lines, {"in order" if ordered else "OUT OF ORDER"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Startup benchmark: time from interpreter start to a QuarkPanFileManager built from saved cookies.
+
+Each run is a fresh interpreter in a temporary directory holding config/cookies.txt in the format QuarkLogin saves.
+Also reports whether Playwright was imported. Run from the repository root:  python bench/bench_startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = f'''
+import sys
+sys.path.insert(0, {ROOT!r})
+from quark import QuarkPanFileManager
+manager = QuarkPanFileManager()
+assert manager.cookies
+print('playwright' in ' '.join(sys.modules))
+'''
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'config'))
+        cookies = [{'name': '__uid', 'value': 'mock-user', 'domain': '.quark.cn', 'path': '/', 'expires': -1,
+                    'httpOnly': False, 'secure': True, 'sameSite': 'Lax'},
+                   {'name': '__pus', 'value': 'x' * 200, 'domain': 'pan.quark.cn', 'path': '/', 'expires': -1,
+                    'httpOnly': True, 'secure': True, 'sameSite': 'None'}]
+        with open(os.path.join(tmp, 'config', 'cookies.txt'), 'w', encoding='utf-8') as f:
+            f.write(str(cookies))
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, '-c', SCRIPT], cwd=tmp, capture_output=True, text=True,
+                                    check=True)
+            timings.append(time.perf_counter() - start)
+        baseline = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', 'pass'], check=True)
+            baseline.append(time.perf_counter() - start)
+    print(f'startup: median {statistics.median(timings) * 1000:.0f}ms, min {min(timings) * 1000:.0f}ms '
+          f'(bare interpreter {statistics.median(baseline) * 1000:.0f}ms), '
+          f'playwright imported: {result.stdout.strip()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Task polling benchmark: one polling loop per task, as submit_task used to do, against the shared TaskPoller.
+
+Every mock task finishes ``--duration`` seconds after it is created. Run from the repository root:
+python bench/bench_tasks.py --tasks 200 --duration 3 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager  # noqa: E402
+from quark import QuarkPanFileManager  # noqa: E402
+
+
+async def poll_loop(manager: QuarkPanFileManager, task_id: str, retry: int = 50) -> bool:
+    for i in range(retry):
+        await asyncio.sleep(random.randint(500, 1000) / 1000)
+        json_data = await manager.query_task(task_id, i)
+        if json_data['data']['status'] == 2:
+            return True
+    return False
+
+
+async def poller(manager: QuarkPanFileManager, task_id: str) -> bool:
+    try:
+        await manager.task_poller.wait(task_id)
+    except TimeoutError:
+        return False
+    return True
+
+
+async def run_tasks(manager: QuarkPanFileManager, tasks: int, wait) -> tuple[float, int]:
+    start = time.perf_counter()
+    task_ids = await asyncio.gather(*(manager.get_share_task_id(f'fid{i}', f'dir{i}') for i in range(tasks)))
+    done = await asyncio.gather(*(wait(manager, task_id) for task_id in task_ids))
+    elapsed = time.perf_counter() - start
+    await manager.close()
+    return elapsed, sum(done)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=200)
+    parser.add_argument('--duration', type=float, nargs='+', default=[3.0, 10.0])
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per request')
+    args = parser.parse_args()
+
+    with MockQuarkServer(latency=args.latency) as server:
+        for duration in args.duration:
+            server.task_duration = duration
+            for label, wait in (('loop per task', poll_loop), ('TaskPoller', poller)):
+                manager = make_manager(server)
+                requests = server.requests
+                elapsed, finished = asyncio.run(run_tasks(manager, args.tasks, wait))
+                polls = server.requests - requests - args.tasks
+                print(f'{duration:4.0f}s tasks, {label:<13}: {elapsed:6.2f}s  {finished}/{args.tasks} finished  '
+                      f'{polls} polls ({polls / args.tasks:.1f} per task)')
+
+
+if __name__ == '__main__':
+    main()
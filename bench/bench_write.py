@@ -0,0 +1,128 @@
+"""
+Disk write path benchmark: concurrent downloads while a probe task measures how late the event loop wakes it.
+
+A responsive loop wakes the probe within a fraction of a millisecond; writes done inside the loop show up as lag.
+The mock server runs in a child process so that its own work does not count against the client's loop.
+--disk-speed slows every write to part files down to that many bytes/s (a blocking sleep, like a stalled disk) to
+show what happens when the disk cannot keep up. Run from the repository root:
+  python bench/bench_write.py --files 8 --file-size 128M --disk-speed 200M
+"""
+import argparse
+import asyncio
+import builtins
+import contextlib
+import io
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from bench.suite import make_manager, parse_size  # noqa: E402
+from quark import QuarkPanFileManager  # noqa: E402
+
+
+class SlowFile:
+    """File wrapper whose writes block for ``len(data) / speed`` seconds on top of the real write."""
+
+    def __init__(self, f, speed: float) -> None:
+        self._f = f
+        self._speed = speed
+
+    def write(self, data) -> int:
+        time.sleep(len(data) / self._speed)
+        return self._f.write(data)
+
+    def writelines(self, lines) -> None:
+        for data in lines:
+            self.write(data)
+
+    def __enter__(self) -> 'SlowFile':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._f.close()
+
+    def __getattr__(self, name: str):
+        return getattr(self._f, name)
+
+
+def slow_part_files(speed: float) -> None:
+    real_open = builtins.open
+
+    def open_(file, mode='r', *args, **kwargs):
+        f = real_open(file, mode, *args, **kwargs)
+        if str(file).endswith('.part') and ('w' in mode or '+' in mode):
+            return SlowFile(f, speed)
+        return f
+    builtins.open = open_
+
+
+def serve(files: int, file_size: int, conn) -> None:
+    with MockQuarkServer(files=files, file_size=file_size) as server:
+        conn.send(server.base_url)
+        conn.recv()  # 等待父进程结束基准测试
+
+
+async def probe(lags: list[float], interval: float = 0.005) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)
+
+
+async def download_all(manager: QuarkPanFileManager, fids: list[str]) -> tuple[float, list[float]]:
+    lags: list[float] = []
+    probe_task = asyncio.create_task(probe(lags))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        await manager.quark_file_download(fids)
+    elapsed = time.perf_counter() - start
+    probe_task.cancel()
+    await manager.close()
+    return elapsed, lags
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--file-size', type=parse_size, default='128M')
+    parser.add_argument('--segments', type=int, default=4)
+    parser.add_argument('--chunk-size', type=parse_size, default='256K', help='bytes read from the response at a time')
+    parser.add_argument('--write-buffer', type=parse_size, default='4M', help='bytes collected per disk write')
+    parser.add_argument('--no-preallocate', action='store_true')
+    parser.add_argument('--no-verify', action='store_true', help='do not hash files while they are written')
+    parser.add_argument('--disk-speed', type=parse_size, default='0', help='bytes/s per part file write, 0 = real disk')
+    args = parser.parse_args()
+
+    fids = [f'f{i:08d}' for i in range(args.files)]
+    conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(args.files, args.file_size, child_conn), daemon=True)
+    server.start()
+    base_url = conn.recv()
+    if args.disk_speed:
+        slow_part_files(args.disk_speed)
+    with tempfile.TemporaryDirectory(dir='.') as tmp:
+        os.chdir(tmp)
+        manager = make_manager(base_url, download_concurrency=args.files, download_segments=args.segments,
+                               min_segment_size=1024 * 1024, download_chunk_size=args.chunk_size,
+                               write_buffer_size=args.write_buffer, preallocate=not args.no_preallocate,
+                               verify_downloads=not args.no_verify)
+        elapsed, lags = asyncio.run(download_all(manager, fids))
+        os.chdir('..')
+    conn.send(None)
+    server.join()
+    lags.sort()
+    total = args.files * args.file_size
+    print(f'{args.files} x {args.file_size / 1024 ** 2:.0f} MiB: {elapsed:6.2f}s  '
+          f'{total / elapsed / 1024 ** 2:7.1f} MiB/s  loop lag p50 {statistics.median(lags) * 1000:.2f}ms  '
+          f'p99 {lags[int(len(lags) * 0.99)] * 1000:.2f}ms  max {lags[-1] * 1000:.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Union
+from urllib.parse import parse_qs, urlsplit
+
+
+class Request:
+    def __init__(self, method: str, target: str, headers: dict[str, str], body: bytes) -> None:
+        self.method = method
+        parts = urlsplit(target)
+        self.path = parts.path
+        self.query = {k: v[-1] for k, v in parse_qs(parts.query, keep_blank_values=True).items()}
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> dict[str, Any]:
+        return json.loads(self.body or b'{}')
+
+
+PATTERN_PERIOD = 251
+PATTERN = bytes((i * 31 + 7) % 256 for i in range(PATTERN_PERIOD)) * (1024 * 1024 // PATTERN_PERIOD + 2)
+
+
+def file_md5(size: int) -> str:
+    """Base64 MD5 of a mock file of ``size`` bytes, the way the download API reports it."""
+    digest = hashlib.md5()
+    for start in range(0, size, 1024 * 1024):
+        digest.update(file_bytes(start, min(1024 * 1024, size - start)))
+    return base64.b64encode(digest.digest()).decode()
+
+
+def file_bytes(start: int, length: int) -> bytes:
+    """Deterministic content of every mock file: byte ``i`` is ``PATTERN[i % 251]``."""
+    parts = []
+    while length > 0:
+        offset = start % PATTERN_PERIOD
+        piece = PATTERN[offset:offset + min(length, len(PATTERN) - PATTERN_PERIOD)]
+        parts.append(piece)
+        start += len(piece)
+        length -= len(piece)
+    return b''.join(parts)
+
+
+class Response:
+    def __init__(self, status: int = 200, body: Union[bytes, dict, None] = None,
+                 headers: Union[dict[str, str], None] = None, stream: Union[AsyncIterator[bytes], None] = None,
+                 length: int = 0) -> None:
+        self.status = status
+        self.headers = headers or {}
+        if isinstance(body, dict):
+            self.headers.setdefault('content-type', 'application/json')
+            body = json.dumps(body, ensure_ascii=False).encode()
+        self.body = body or b''
+        self.stream = stream
+        self.length = length if stream is not None else len(self.body)
+
+
+def ok(data: Any, **metadata) -> Response:
+    return Response(body={'status': 200, 'code': 0, 'message': 'ok', 'data': data, 'metadata': metadata})
+
+
+class MockQuarkServer:
+    """
+    Minimal HTTP/1.1 stand-in for drive-pc.quark.cn, served from a background thread.
+
+    ``handshake`` is slept once per new connection to model the TCP+TLS setup that keep-alive saves,
+    ``latency`` is slept on every request to model the API round trip, ``bandwidth`` (bytes/s) throttles every
+    download connection the way a CDN throttles a single stream, and ``ranges=False`` makes downloads ignore Range.
+    ``tree=(depth, dirs, files)`` serves a generated folder tree instead of ``files`` flat entries, and download
+    URLs older than ``url_ttl`` seconds are answered with 403 like expired signed links. Server-side tasks finish
+    after ``task_polls`` polls and ``task_duration`` seconds, whichever comes last. With ``capacity`` set, API
+    requests beyond that many in flight are answered with 429 like a rate-limited gateway. ``error_rate`` answers
+    that fraction of API requests with 503, and ``error_codes`` maps API paths to the error code they always return.
+    With ``checksums`` the download API reports the MD5 of every file, and ``corrupt_rate`` flips one byte in that
+    fraction of download responses. ``drive`` holds folders that exist only in the user's drive, by fid: they are
+    listed from there, and saves into them add the saved entries. ``updated`` overrides the ``updated_at`` of
+    entries by fid.
+    """
+
+    reasons = {200: 'OK', 206: 'Partial Content', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+               416: 'Range Not Satisfiable', 429: 'Too Many Requests', 500: 'Internal Server Error',
+               503: 'Service Unavailable'}
+
+    def __init__(self, files: int = 200, file_size: int = 1024, latency: float = 0.0, handshake: float = 0.0,
+                 bandwidth: float = 0.0, ranges: bool = True, tree: Union[tuple[int, int, int], None] = None,
+                 host: str = '127.0.0.1', port: int = 0) -> None:
+        self.files = files
+        self.tree = tree
+        self.file_size = file_size
+        self.latency = latency
+        self.handshake = handshake
+        self.bandwidth = bandwidth
+        self.ranges = ranges
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.requests = 0
+        self.routes: dict[str, Callable[[Request], Response]] = {
+            '/1/clouddrive/share/sharepage/token': self.token,
+            '/1/clouddrive/share/sharepage/detail': self.detail,
+            '/1/clouddrive/file/sort': self.sort,
+            '/account/info': self.account_info,
+            '/1/clouddrive/share/sharepage/save': self.save,
+            '/1/clouddrive/task': self.task,
+            '/1/clouddrive/file/download': self.download_urls,
+            '/1/clouddrive/share': self.save,
+            '/1/clouddrive/share/password': self.share_password,
+        }
+        self.task_polls = 1
+        self.saves = 0
+        self.saved_items = 0
+        self.drive: dict[str, list[str]] = {}
+        self.updated: dict[str, int] = {}
+        self.task_duration = 0.0
+        self.capacity = 0
+        self.in_flight = 0
+        self.throttled = 0
+        self.error_rate = 0.0
+        self.error_codes: dict[str, int] = {}
+        self.failed = 0
+        self.max_page_size = 100
+        self.is_owner = 0
+        self.url_ttl = 0.0
+        self.expired = 0
+        self.checksums = False
+        self.corrupt_rate = 0.0
+        self.corrupted = 0
+        self._md5: dict[int, str] = {}
+        self._tasks: dict[str, list[float]] = {}
+        self._children: dict[str, list[str]] = {}
+        self._loop: Union[asyncio.AbstractEventLoop, None] = None
+        self._server: Union[asyncio.AbstractServer, None] = None
+        self._thread: Union[threading.Thread, None] = None
+        self._started = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    @staticmethod
+    def parent_of(fid: str) -> str:
+        parts = fid[1:].split('.')
+        return 'd' + '.'.join(parts[:-1]) if len(parts) > 1 else '0'
+
+    def entry(self, fid: str) -> dict[str, Any]:
+        is_dir = fid.startswith('d')
+        return {'fid': fid, 'file_name': fid if is_dir else f'{fid}.bin', 'file_type': 0 if is_dir else 1,
+                'dir': is_dir, 'pdir_fid': self.parent_of(fid), 'size': 0 if is_dir else self.file_size,
+                'include_items': self.tree[1] + self.tree[2] if is_dir and self.tree else '',
+                'share_fid_token': f't{fid}', 'status': 1, 'updated_at': self.updated.get(fid, 1700000000000)}
+
+    def children(self, pdir_fid: str) -> list[str]:
+        """Child fids of a folder: ``files`` flat files under every folder, or the generated ``tree``."""
+        if pdir_fid not in self._children:
+            self._children[pdir_fid] = self._make_children(pdir_fid)
+        return self._children[pdir_fid]
+
+    def _make_children(self, pdir_fid: str) -> list[str]:
+        if not self.tree:
+            return [f'f{i:08d}' for i in range(self.files)]
+        depth, dirs, files = self.tree
+        path = [] if pdir_fid in ('0', '') else pdir_fid[1:].split('.')
+        prefix = '.'.join(path) + '.' if path else ''
+        subdirs = [f'd{prefix}{k}' for k in range(dirs)] if len(path) < depth else []
+        return subdirs + [f'f{prefix}{k}' for k in range(files)]
+
+    def page(self, request: Request,
+             fids: Union[list[str], None] = None) -> tuple[list[dict[str, Any]], dict[str, int]]:
+        page = int(request.query.get('_page', 1))
+        size = min(int(request.query.get('_size', 50)), self.max_page_size)
+        start = (page - 1) * size
+        if fids is None:
+            fids = self.children(request.query.get('pdir_fid', '0'))
+        items = [self.entry(fid) for fid in fids[start:start + size]]
+        return items, {'_total': len(fids), '_size': size, '_page': page, '_count': len(items)}
+
+    def token(self, request: Request) -> Response:
+        return ok({'stoken': 'mock-stoken'})
+
+    def detail(self, request: Request) -> Response:
+        items, metadata = self.page(request)
+        return ok({'is_owner': self.is_owner, 'list': items}, **metadata)
+
+    def sort(self, request: Request) -> Response:
+        items, metadata = self.page(request, self.drive.get(request.query.get('pdir_fid', '0')))
+        return ok({'list': items}, **metadata)
+
+    def save(self, request: Request) -> Response:
+        self.saves += 1
+        body = request.json()
+        self.saved_items += len(body.get('fid_list', []))
+        if body.get('to_pdir_fid') in self.drive:
+            self.drive[body['to_pdir_fid']].extend(body.get('fid_list', []))
+        task_id = f'task{len(self._tasks):08d}'
+        self._tasks[task_id] = [0, time.monotonic()]
+        return ok({'task_id': task_id})
+
+    def task(self, request: Request) -> Response:
+        """A task reports status 2 (finished) after ``task_polls`` polls and ``task_duration`` seconds."""
+        task_id = request.query.get('task_id', '')
+        task = self._tasks.setdefault(task_id, [0, time.monotonic()])
+        task[0] += 1
+        finished = task[0] >= self.task_polls and time.monotonic() - task[1] >= self.task_duration
+        status = 2 if finished else 1
+        return ok({'task_id': task_id, 'status': status, 'task_title': '分享-转存', 'share_id': f's{task_id}',
+                   'save_as': {'to_pdir_name': 'mock'}})
+
+    def share_password(self, request: Request) -> Response:
+        share_id = request.json().get('share_id', '')
+        return ok({'share_url': f'https://pan.quark.cn/s/{share_id}', 'title': share_id})
+
+    def download_urls(self, request: Request) -> Response:
+        data = []
+        for fid in request.json().get('fids', []):
+            item = self.entry(fid)
+            item['download_url'] = f'{self.base_url}/dl/{fid}?size={item["size"]}&issued={time.time()}'
+            if self.checksums:
+                if item['size'] not in self._md5:
+                    self._md5[item['size']] = file_md5(item['size'])
+                item['md5'] = self._md5[item['size']]
+            data.append(item)
+        return ok(data)
+
+    async def _file_stream(self, start: int, length: int) -> AsyncIterator[bytes]:
+        chunk_size = 64 * 1024
+        corrupt = length > 0 and random.random() < self.corrupt_rate
+        if corrupt:
+            self.corrupted += 1
+        while length > 0:
+            size = min(chunk_size, length)
+            data = file_bytes(start, size)
+            if corrupt:
+                data, corrupt = bytes([data[0] ^ 0xff]) + data[1:], False
+            yield data
+            start += size
+            length -= size
+            if self.bandwidth:
+                await asyncio.sleep(size / self.bandwidth)
+
+    def download(self, request: Request) -> Response:
+        if self.url_ttl and time.time() - float(request.query.get('issued', 0)) > self.url_ttl:
+            self.expired += 1
+            return Response(403, b'expired')
+        size = int(request.query.get('size', self.file_size))
+        match = re.match(r'bytes=(\d+)-(\d*)$', request.headers.get('range', ''))
+        if not (match and self.ranges):
+            return Response(200, headers={'accept-ranges': 'none'}, stream=self._file_stream(0, size), length=size)
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+        if start >= size:
+            return Response(416, headers={'content-range': f'bytes */{size}'})
+        headers = {'content-range': f'bytes {start}-{end}/{size}', 'accept-ranges': 'bytes'}
+        return Response(206, headers=headers, stream=self._file_stream(start, end - start + 1), length=end - start + 1)
+
+    def account_info(self, request: Request) -> Response:
+        return Response(body={'success': True, 'data': {'nickname': 'mock-user'}})
+
+    async def handle(self, request: Request) -> Response:
+        if self.capacity and not request.path.startswith('/dl/') and self.in_flight >= self.capacity:
+            self.throttled += 1
+            return Response(429, {'status': 429, 'code': 429, 'message': '请求过于频繁', 'data': None})
+        if not request.path.startswith('/dl/'):
+            if request.path in self.error_codes:
+                self.failed += 1
+                code = self.error_codes[request.path]
+                return Response(400, {'status': 400, 'code': code, 'message': f'mock error {code}', 'data': None})
+            if self.error_rate and random.random() < self.error_rate:
+                self.failed += 1
+                return Response(503, {'status': 503, 'code': 503, 'message': 'unavailable', 'data': None})
+        self.in_flight += 1
+        try:
+            return await self._handle(request)
+        finally:
+            self.in_flight -= 1
+
+    async def _handle(self, request: Request) -> Response:
+        if self.latency:
+            await asyncio.sleep(self.latency * random.uniform(0.8, 1.2))
+        route = self.download if request.path.startswith('/dl/') else self.routes.get(request.path)
+        if route is None:
+            return Response(404, {'status': 404, 'code': 404, 'message': 'not found', 'data': None})
+        result = route(request)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            if self.handshake:
+                await asyncio.sleep(self.handshake)
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                method, target, _ = request_line.split(' ', 2)
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        key, value = line.split(':', 1)
+                        headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                self.requests += 1
+                response = await self.handle(Request(method, target, headers, body))
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                response.headers['content-length'] = str(response.length)
+                response.headers['connection'] = 'keep-alive' if keep_alive else 'close'
+                status_line = f'HTTP/1.1 {response.status} {self.reasons.get(response.status, "OK")}\r\n'
+                header_block = ''.join(f'{k}: {v}\r\n' for k, v in response.headers.items())
+                writer.write((status_line + header_block + '\r\n').encode('latin-1') + response.body)
+                await writer.drain()
+                if response.stream is not None:
+                    async for chunk in response.stream:
+                        writer.write(chunk)
+                        await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _main(self) -> None:
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start(self) -> 'MockQuarkServer':
+        def target() -> None:
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self._main())
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def _shutdown(self) -> None:
+        self._server.close()
+        for task in asyncio.all_tasks(self._loop):
+            task.cancel()
+
+    def stop(self) -> None:
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._shutdown)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> 'MockQuarkServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
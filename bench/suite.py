@@ -0,0 +1,189 @@
+"""
+Benchmark suite: scripted end-to-end scenarios against the local mock Quark server.
+
+Scenarios:
+  batch     transfer --links share links with batch_run
+  listing   list a share of --entries entries (get_detail)
+  small     download --small-files files of --small-size bytes from one share
+  large     download one --large-size file (ranged, segmented)
+  share     generate share links for --share-dirs**2 second-level folders
+
+Every scenario reports wall time, the units that succeeded and failed, the throughput of the units that succeeded,
+the number of API requests and the p50/p99 latency of those requests as seen by the client. --error-rate,
+--capacity and --latency apply to every scenario, so failure injection and throttling can be combined with any of
+them. --corrupt-rate makes the server report MD5 checksums and corrupt that fraction of download responses,
+which the client has to detect and download again. Sizes accept K/M/G suffixes.
+Run from the repository root:
+  python bench/suite.py --small-files 10000 --large-size 20G
+  python bench/suite.py --scenarios batch share --error-rate 0.05 --json results.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Union
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_server import MockQuarkServer  # noqa: E402
+from quark import QuarkPanFileManager  # noqa: E402
+from quark_metrics import Histogram  # noqa: E402
+
+SCENARIOS = ('batch', 'listing', 'small', 'large', 'share')
+
+
+def parse_size(value: str) -> int:
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = value.strip().upper().rstrip('B')
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def make_manager(server: Union[MockQuarkServer, str], **kwargs) -> QuarkPanFileManager:
+    """A manager logged in with a dummy cookie that sends every API request to ``server`` (or its base URL)."""
+    options = {'cookies': 'mock=1', 'use_metadata_cache': False, 'incremental_download': False, **kwargs}
+    manager = QuarkPanFileManager(**options)
+    manager.api_host = manager.save_host = manager.account_host = server if isinstance(server, str) else server.base_url
+    return manager
+
+
+def latency_percentiles(manager: QuarkPanFileManager) -> tuple[float, float]:
+    merged = Histogram()
+    for histogram in manager.metrics.latency.values():
+        merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+        merged.count += histogram.count
+        merged.sum += histogram.sum
+    return merged.quantile(0.5), merged.quantile(0.99)
+
+
+async def measure(manager: QuarkPanFileManager, work: Callable[[], Awaitable[Any]]) -> tuple[float, Any]:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        try:
+            value = await work()
+        finally:
+            await manager.close()
+    return time.perf_counter() - start, value
+
+
+def run_scenario(name: str, args: argparse.Namespace, tmp: str) -> dict[str, Any]:
+    server_options = {'latency': args.latency}
+    if name == 'batch':
+        server = MockQuarkServer(files=10, **server_options)
+    elif name == 'listing':
+        server = MockQuarkServer(files=args.entries, **server_options)
+    elif name == 'small':
+        server = MockQuarkServer(files=args.small_files, file_size=args.small_size, **server_options)
+    elif name == 'large':
+        server = MockQuarkServer(files=1, file_size=args.large_size, bandwidth=args.bandwidth, **server_options)
+    else:
+        server = MockQuarkServer(tree=(2, args.share_dirs, 0), **server_options)
+
+    with server:
+        server.is_owner = int(name in ('small', 'large'))  # 只有自己的分享才会直接下载
+        server.task_duration = args.task_duration
+        manager = make_manager(server, download_concurrency=args.download_concurrency, share_rate=0)
+        workdir = os.path.join(tmp, name)
+        os.makedirs(workdir)
+        os.chdir(workdir)
+        server.error_rate = args.error_rate
+        server.capacity = args.capacity
+        server.checksums = args.corrupt_rate > 0
+        server.corrupt_rate = args.corrupt_rate
+        requests = server.requests
+
+        if name == 'batch':
+            urls = [f'https://pan.quark.cn/s/mock{i:06d}' for i in range(args.links)]
+            units, unit = args.links, 'links'
+            work = lambda: manager.batch_run(urls, '0', args.transfer_concurrency)  # noqa: E731
+        elif name == 'listing':
+            units, unit = args.entries, 'entries'
+            work = lambda: manager.get_detail('pwd', 'stoken', use_cache=False)  # noqa: E731
+        elif name in ('small', 'large'):
+            units, unit = (args.small_files, 'files') if name == 'small' else (args.large_size, 'bytes')
+            work = lambda: manager.run('https://pan.quark.cn/s/mock', '0', download=True)  # noqa: E731
+        else:
+            units, unit = args.share_dirs ** 2, 'folders'
+            work = lambda: manager.share_run('https://pan.quark.cn/s/0', '0', traverse_depth=2)  # noqa: E731
+
+        elapsed, value = asyncio.run(measure(manager, work))
+        p50, p99 = latency_percentiles(manager)
+        downloads = manager.metrics.snapshot()['downloads']
+        if name == 'batch':
+            succeeded = sum(1 for i in value if i['ok'])
+        elif name == 'listing':
+            succeeded = len(value[1])
+        elif name == 'small':
+            succeeded = downloads['files']
+        elif name == 'large':
+            succeeded = units if downloads['files'] else 0
+        else:
+            shared, failed = value
+            succeeded = shared - failed
+        return {
+            'scenario': name,
+            'seconds': elapsed,
+            'units': units,
+            'unit': unit,
+            'succeeded': succeeded,
+            'failed': units - succeeded,
+            'throughput': succeeded / elapsed,
+            'requests': server.requests - requests,
+            'injected_failures': server.failed + server.throttled + server.corrupted,
+            'p50_ms': p50 * 1000,
+            'p99_ms': p99 * 1000,
+            'download_bytes': downloads['bytes'],
+            'download_files': downloads['files'],
+            'download_failed': downloads['failed'],
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per API request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of API requests answered with 503')
+    parser.add_argument('--capacity', type=int, default=0, help='API requests in flight before the server sends 429')
+    parser.add_argument('--corrupt-rate', type=float, default=0.0, help='fraction of downloads with a flipped byte')
+    parser.add_argument('--task-duration', type=float, default=0.0, help='seconds until a server-side task ends')
+    parser.add_argument('--links', type=int, default=200)
+    parser.add_argument('--transfer-concurrency', type=int, default=20)
+    parser.add_argument('--entries', type=int, default=50000)
+    parser.add_argument('--small-files', type=int, default=10000)
+    parser.add_argument('--small-size', type=parse_size, default='4K')
+    parser.add_argument('--large-size', type=parse_size, default='20G')
+    parser.add_argument('--bandwidth', type=parse_size, default='0', help='bytes/s per download connection')
+    parser.add_argument('--download-concurrency', type=int, default=16)
+    parser.add_argument('--share-dirs', type=int, default=20)
+    parser.add_argument('--json', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            for name in args.scenarios:
+                result = run_scenario(name, args, tmp)
+                results.append(result)
+                throughput = result['throughput']
+                rate = (f'{throughput / 1024 ** 2:8.1f} MiB/s' if result['unit'] == 'bytes'
+                        else f'{throughput:8.1f} {result["unit"]}/s')
+                print(f'{name:>8}: {result["seconds"]:7.2f}s  {rate}  {result["succeeded"]} ok  '
+                      f'{result["failed"]} failed  {result["requests"]:6d} requests  '
+                      f'p50 {result["p50_ms"]:6.1f}ms  p99 {result["p99_ms"]:6.1f}ms  '
+                      f'{result["injected_failures"]} injected failures', flush=True)
+        finally:
+            os.chdir(cwd)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,117 @@
 
 import asyncio
+import contextlib
+import functools
+import hashlib
+import importlib.util
 import json
 import os
 import random
 import re
 import sys
-from typing import Any, Union
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Union
+from urllib.parse import urlsplit
 
 import httpx
 from prettytable import PrettyTable
-from tqdm import tqdm
-
+from quark_cache import MetadataCache
+from quark_download import DownloadManifest, DownloadUrlPipeline, QuarkDownloader
+from quark_index import DriveIndex
+from quark_journal import DONE, FAILED, PENDING, SAVING, STOKEN_OK, TransferJournal
+from quark_limits import AdaptiveLimiter, TokenBucket
 from quark_login import CONFIG_DIR, QuarkLogin
-from utils import custom_print, generate_random_code, get_datetime, get_timestamp, read_config, safe_copy, save_config
+from quark_metrics import Metrics
+from quark_progress import ProgressReporter
+from quark_retry import RetryPolicy
+from quark_session import QuarkSession
+from quark_tasks import TaskPoller
+from quark_walker import join_path, walk_tree
+from utils import (QuarkApiError, custom_print, generate_random_code, get_datetime, get_timestamp, read_config,
+                   safe_copy, save_config)
 
 
 class QuarkPanFileManager:
-    def __init__(self, headless: bool = False, slow_mo: int = 0) -> None:
+    api_host: str = 'https://drive-pc.quark.cn'
+    save_host: str = 'https://drive.quark.cn'
+    account_host: str = 'https://pan.quark.cn'
+    max_page_size: int = 100
+    download_batch_size: int = 50
+    rate_limit_codes: frozenset[int] = frozenset({429})
+    folder_search_limit: int = 50
+
+    def __init__(self, headless: bool = False, slow_mo: int = 0, cookies: Union[str, None] = None,
+                 max_connections: int = 100, max_keepalive_connections: int = 20, keepalive_expiry: float = 30.0,
+                 max_connections_per_host: Union[int, None] = None, http2: bool = False,
+                 transfer_concurrency: int = 5, download_segments: int = 4,
+                 min_segment_size: int = 16 * 1024 * 1024, download_concurrency: int = 4,
+                 download_retries: int = 3, page_size: int = 50, page_concurrency: int = 8,
+                 list_concurrency: int = 8, download_lookahead: int = 100,
+                 download_url_max_age: float = 1800.0, use_metadata_cache: bool = True,
+                 metadata_cache_ttl: float = 600.0, download_dir: str = 'downloads',
+                 incremental_download: bool = True, task_poll_interval: float = 0.5,
+                 task_poll_max_interval: float = 1.0, share_concurrency: int = 8, share_rate: float = 2.0,
+                 share_burst: int = 4, api_concurrency: int = 16, api_max_concurrency: int = 64,
+                 session_ttl: float = 1800.0, metrics_path: Union[str, None] = None,
+                 metrics_interval: float = 60.0, download_chunk_size: int = 256 * 1024,
+                 write_buffer_size: int = 4 * 1024 * 1024, preallocate: bool = True, progress: str = 'auto',
+                 progress_top: int = 5, verify_downloads: bool = True, use_journal: bool = True,
+                 skip_existing: bool = False, use_drive_index: bool = True, drive_index_interval: float = 600.0,
+                 drive_index_concurrency: int = 4) -> None:
         self.headless: bool = headless
         self.slow_mo: int = slow_mo
         self.folder_id: Union[str, None] = None
-        self.user: Union[str, None] = '用户A'
-        self.pdir_id: Union[str, None] = '0'
-        self.dir_name: Union[str, None] = '根目录'
-        self.cookies: str = self.get_cookies()
+        self.session = QuarkSession(ttl=session_ttl)
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.max_connections_per_host: Union[int, None] = max_connections_per_host
+        self.http2: bool = http2
+        if http2 and importlib.util.find_spec('h2') is None:
+            custom_print('未安装 h2 模块，HTTP/2 已禁用（pip install httpx[http2]）', error_msg=True)
+            self.http2 = False
+        self._client: Union[httpx.AsyncClient, None] = None
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+        self.api_limiter = AdaptiveLimiter(initial=api_concurrency, max_limit=api_max_concurrency, log=custom_print)
+        self.retry_policy = RetryPolicy(log=custom_print)
+        self.transfer_concurrency: int = transfer_concurrency
+        self.metrics = Metrics()
+        self.metrics_path: Union[str, None] = metrics_path
+        self.metrics_interval: float = metrics_interval
+        self._metrics_task: Union[asyncio.Task, None] = None
+        self.progress = ProgressReporter(mode=progress, top=progress_top)
+        self.downloader = QuarkDownloader(self._stream, segments=download_segments, min_segment_size=min_segment_size,
+                                          chunk_size=download_chunk_size, write_buffer_size=write_buffer_size,
+                                          preallocate=preallocate, on_bytes=self.metrics.observe_bytes,
+                                          progress=self.progress, verify=verify_downloads)
+        self.download_semaphore = asyncio.Semaphore(download_concurrency)
+        self.download_retries: int = max(1, download_retries)
+        self.page_size: int = max(1, min(page_size, self.max_page_size))
+        self.page_concurrency: int = max(1, page_concurrency)
+        self.list_concurrency: int = max(1, list_concurrency)
+        self.download_concurrency: int = max(1, download_concurrency)
+        self.download_lookahead: int = download_lookahead
+        self.download_url_max_age: float = download_url_max_age
+        self.metadata_cache = MetadataCache(ttl=metadata_cache_ttl, enabled=use_metadata_cache)
+        self.journal = TransferJournal(enabled=use_journal)
+        self.skip_existing: bool = skip_existing
+        self._folder_indexes: dict[str, tuple[float, set[tuple[str, int]]]] = {}
+        self._folder_index_lock = asyncio.Lock()
+        self._saving_entries: dict[str, dict[tuple[str, int], asyncio.Event]] = {}
+        self.drive_index = DriveIndex(enabled=use_drive_index)
+        self.drive_index_interval: float = drive_index_interval
+        self.drive_index_concurrency: int = max(1, drive_index_concurrency)
+        self._drive_index_thread: Union[threading.Thread, None] = None
+        self.download_dir: str = download_dir
+        self.incremental_download: bool = incremental_download
+        self.task_poller = TaskPoller(self.query_task, initial_delay=task_poll_interval,
+                                      max_delay=task_poll_max_interval)
+        self.share_concurrency: int = max(1, share_concurrency)
+        self.share_limiter = TokenBucket(share_rate, share_burst)
+        self.download_user_agent: str = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like "
+                                         "Gecko) Chrome/143.0.0.0 Safari/537.36 Edg/143.0.0.0")
+        self.cookies: str = cookies or self.get_cookies()
         self.headers: dict[str, str] = {
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko)'
                           ' Chrome/94.0.4606.71 Safari/537.36 Core/1.94.225.400 QQBrowser/12.2.5544.400',
@@ -33,11 +121,171 @@ class QuarkPanFileManager:
             'cookie': self.cookies,
         }
 
+    @property
+    def user(self) -> Union[str, None]:
+        return self.session.user
+
+    @user.setter
+    def user(self, value: Union[str, None]) -> None:
+        self.session.user = value
+
+    @property
+    def pdir_id(self) -> Union[str, None]:
+        return self.session.pdir_id
+
+    @pdir_id.setter
+    def pdir_id(self, value: Union[str, None]) -> None:
+        self.session.pdir_id = value
+
+    @property
+    def dir_name(self) -> Union[str, None]:
+        return self.session.dir_name
+
+    @dir_name.setter
+    def dir_name(self, value: Union[str, None]) -> None:
+        self.session.dir_name = value
+
     def get_cookies(self) -> str:
         quark_login = QuarkLogin(headless=self.headless, slow_mo=self.slow_mo)
         cookies: str = quark_login.get_cookies()
         return cookies
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # 整个会话共用一个连接池，API 请求和下载都复用连接
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self.limits, http2=self.http2,
+                                             timeout=httpx.Timeout(60.0, connect=60.0))
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self.metadata_cache.close()
+        self.journal.close()
+        self.drive_index.close()
+        if self._metrics_task is not None:
+            self._metrics_task.cancel()
+            self._metrics_task = None
+        if self.metrics_path:
+            self.metrics.write(self.metrics_path)
+
+    async def _write_metrics(self) -> None:
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            self.metrics.write(self.metrics_path)
+
+    @property
+    def account_key(self) -> str:
+        # 优先用 cookie 中的 __uid 区分账号，没有时用整个 cookie 的哈希
+        match = re.search(r'(?:^|;\s*)__uid=([^;]+)', self.cookies or '')
+        return match.group(1) if match else hashlib.sha1((self.cookies or '').encode()).hexdigest()
+
+    async def __aenter__(self) -> 'QuarkPanFileManager':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    @contextlib.asynccontextmanager
+    async def _host_slot(self, url: str) -> AsyncIterator[None]:
+        if not self.max_connections_per_host:
+            yield
+            return
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.max_connections_per_host)
+        async with semaphore:
+            yield
+
+    def throttle_reason(self, response: httpx.Response) -> Union[str, None]:
+        # 服务器限流（429、5xx 或限流错误码）时返回原因，否则返回 None
+        if response.status_code == 429 or response.status_code >= 500:
+            return f'HTTP {response.status_code}'
+        if response.status_code >= 400:
+            try:
+                json_data = response.json()
+            except ValueError:
+                return None
+            if isinstance(json_data, dict) and (json_data.get('code') in self.rate_limit_codes
+                                                or '频繁' in str(json_data.get('message', ''))):
+                return f'错误码 {json_data.get("code")}：{json_data.get("message")}'
+        return None
+
+    def is_auth_error(self, response: httpx.Response) -> bool:
+        if response.status_code == 401:
+            return True
+        if response.status_code >= 400:
+            try:
+                json_data = response.json()
+            except ValueError:
+                return False
+            return isinstance(json_data, dict) and json_data.get('code') in self.retry_policy.auth_codes
+        return False
+
+    async def _request(self, method: str, url: str, idempotent: Union[bool, None] = None,
+                       **kwargs) -> httpx.Response:
+        # 只重试不会重复副作用的请求：连接失败和 429 都重试，读取失败和 5xx 只在 idempotent（默认为 GET）时重试
+        if idempotent is None:
+            idempotent = method == 'GET'
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = await self._send(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if not idempotent and not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+                    raise
+                delay = self.retry_policy.backoff(e, attempt)
+                if delay is None:
+                    raise
+                reason = repr(e)
+            else:
+                if self.is_auth_error(response):
+                    self.session.invalidate()  # 登录已失效，下次回到菜单时重新校验账号
+                if response.status_code != 429 and (not idempotent or response.status_code < 500):
+                    return response
+                delay = self.retry_policy.delay(self.retry_policy.classify_status(response.status_code), attempt)
+                if delay is None:
+                    return response
+                reason = f'HTTP {response.status_code}'
+            custom_print(f'{method} {urlsplit(url).path} 失败（{reason}），{delay:.1f}秒后重试（第{attempt}次）')
+            await asyncio.sleep(delay)
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if self.metrics_path and (self._metrics_task is None or self._metrics_task.done()):
+            self._metrics_task = asyncio.create_task(self._write_metrics())
+        endpoint = urlsplit(url).path
+        async with self._host_slot(url):
+            await self.api_limiter.acquire()
+            start = time.monotonic()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                self.metrics.observe_request(endpoint, time.monotonic() - start, 'error', type(e).__name__)
+                if isinstance(e, httpx.TimeoutException):
+                    self.api_limiter.on_congestion('请求超时')
+                raise
+            finally:
+                self.api_limiter.release()
+        latency = time.monotonic() - start
+        self.metrics.observe_request(endpoint, latency, str(response.status_code),
+                                     Metrics.error_code(response.status_code, response.content))
+        reason = self.throttle_reason(response)
+        if reason:
+            self.api_limiter.on_congestion(reason)
+        else:
+            self.api_limiter.on_success(latency)
+        return response
+
+    @contextlib.asynccontextmanager
+    async def _stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        async with self._host_slot(url):
+            async with self.client.stream(method, url, **kwargs) as response:
+                yield response
+
     @staticmethod
     def get_pwd_id(share_url: str) -> str:
         return share_url.split('?')[0].split('/s/')[-1]
@@ -55,74 +303,89 @@ class QuarkPanFileManager:
             '__dt': random.randint(100, 9999),
             '__t': get_timestamp(13),
         }
-        api = "https://drive-pc.quark.cn/1/clouddrive/share/sharepage/token"
+        api = f"{self.api_host}/1/clouddrive/share/sharepage/token"
         data = {"pwd_id": pwd_id, "passcode": password}
-        async with httpx.AsyncClient() as client:
-            timeout = httpx.Timeout(60.0, connect=60.0)
-            response = await client.post(api, json=data, params=params, headers=self.headers, timeout=timeout)
+        response = await self._request('POST', api, json=data, params=params, headers=self.headers, idempotent=True)
+        json_data = response.json()
+        if json_data['status'] == 200 and json_data['data']:
+            stoken = json_data["data"]["stoken"]
+        else:
+            stoken = ''
+            custom_print(f"文件转存失败，{json_data['message']}")
+        return stoken
+
+    async def _fetch_all_pages(self, fetch_page: Callable[[int], Awaitable[dict[str, Any]]]) -> list[dict[str, Any]]:
+        # 先取第1页得到总数，其余页并发获取（最多 page_concurrency 个），按页序返回
+        first = await fetch_page(1)
+        metadata = first.get('metadata') or {}
+        total, size = metadata.get('_total') or 0, metadata.get('_size') or 0
+        if not size or total <= size:
+            return [first]
+
+        semaphore = asyncio.Semaphore(self.page_concurrency)
+
+        async def fetch(page: int) -> dict[str, Any]:
+            async with semaphore:
+                return await fetch_page(page)
+
+        rest = await asyncio.gather(*(fetch(page) for page in range(2, -(-total // size) + 1)))
+        return [first, *rest]
+
+    async def get_detail(self, pwd_id: str, stoken: str, pdir_fid: str = '0',
+                         use_cache: bool = True) -> str | tuple | None:
+        api = f"{self.api_host}/1/clouddrive/share/sharepage/detail"
+        cache_scope = f'share:{pwd_id}:{pdir_fid}'
+
+        async def fetch_page(page: int) -> dict[str, Any]:
+            cache_params = {'page': page, 'size': self.page_size}
+            if use_cache and (cached := self.metadata_cache.get(self.account_key, cache_scope, cache_params)):
+                return cached
+            params = {
+                'pr': 'ucpro',
+                'fr': 'pc',
+                'uc_param_str': '',
+                "pwd_id": pwd_id,
+                "stoken": stoken,
+                'pdir_fid': pdir_fid,
+                'force': '0',
+                "_page": str(page),
+                '_size': str(self.page_size),
+                '_sort': 'file_type:asc,updated_at:desc',
+                '__dt': random.randint(200, 9999),
+                '__t': get_timestamp(13),
+            }
+            response = await self._request('GET', api, headers=self.headers, params=params)
             json_data = response.json()
-            if json_data['status'] == 200 and json_data['data']:
-                stoken = json_data["data"]["stoken"]
-            else:
-                stoken = ''
-                custom_print(f"文件转存失败，{json_data['message']}")
-            return stoken
+            if json_data.get('status') == 200 and json_data.get('data'):
+                self.metadata_cache.set(self.account_key, cache_scope, cache_params, json_data)
+            return json_data
 
-    async def get_detail(self, pwd_id: str, stoken: str, pdir_fid: str = '0') -> str | tuple | None:
-        api = "https://drive-pc.quark.cn/1/clouddrive/share/sharepage/detail"
-        page = 1
+        pages = await self._fetch_all_pages(fetch_page)
+        is_owner = pages[0]['data']['is_owner']
         file_list: list[dict[str, Union[int, str]]] = []
-
-        async with httpx.AsyncClient() as client:
-            while True:
-                params = {
-                    'pr': 'ucpro',
-                    'fr': 'pc',
-                    'uc_param_str': '',
-                    "pwd_id": pwd_id,
-                    "stoken": stoken,
-                    'pdir_fid': pdir_fid,
-                    'force': '0',
-                    "_page": str(page),
-                    '_size': '50',
-                    '_sort': 'file_type:asc,updated_at:desc',
-                    '__dt': random.randint(200, 9999),
-                    '__t': get_timestamp(13),
+        for json_data in pages:
+            for file in json_data["data"]["list"]:
+                d: dict[str, Union[int, str]] = {
+                    "fid": file["fid"],
+                    "file_name": file["file_name"],
+                    "file_type": file["file_type"],
+                    "dir": file["dir"],
+                    "pdir_fid": file["pdir_fid"],
+                    "include_items": file.get("include_items", ''),
+                    "share_fid_token": file["share_fid_token"],
+                    "status": file["status"],
+                    "size": file.get("size", 0),
+                    "updated_at": file.get("updated_at", 0)
                 }
-
-                timeout = httpx.Timeout(60.0, connect=60.0)
-                response = await client.get(api, headers=self.headers, params=params, timeout=timeout)
-                json_data = response.json()
-
-                is_owner = json_data['data']['is_owner']
-                _total = json_data['metadata']['_total']
-                if _total < 1:
-                    return is_owner, file_list
-
-                _size = json_data['metadata']['_size']  # 每页限制数量
-                _count = json_data['metadata']['_count']  # 当前页数量
-
-                _list = json_data["data"]["list"]
-
-                for file in _list:
-                    d: dict[str, Union[int, str]] = {
-                        "fid": file["fid"],
-                        "file_name": file["file_name"],
-                        "file_type": file["file_type"],
-                        "dir": file["dir"],
-                        "pdir_fid": file["pdir_fid"],
-                        "include_items": file.get("include_items", ''),
-                        "share_fid_token": file["share_fid_token"],
-                        "status": file["status"]
-                    }
-                    file_list.append(d)
-                if _total <= _size or _count < _size:
-                    return is_owner, file_list
-
-                page += 1
+                file_list.append(d)
+        return is_owner, file_list
 
     async def get_sorted_file_list(self, pdir_fid='0', page='1', size='100', fetch_total='false',
-                                   sort='') -> dict[str, Any]:
+                                   sort='', use_cache: bool = True) -> dict[str, Any]:
+        cache_scope = f'drive:{pdir_fid}'
+        cache_params = {'page': page, 'size': size, 'total': fetch_total, 'sort': sort}
+        if use_cache and (cached := self.metadata_cache.get(self.account_key, cache_scope, cache_params)):
+            return cached
         params = {
             'pr': 'ucpro',
             'fr': 'pc',
@@ -137,12 +400,73 @@ class QuarkPanFileManager:
             '__t': get_timestamp(13),
         }
 
-        async with httpx.AsyncClient() as client:
-            timeout = httpx.Timeout(60.0, connect=60.0)
-            response = await client.get('https://drive-pc.quark.cn/1/clouddrive/file/sort', params=params,
-                                        headers=self.headers, timeout=timeout)
-            json_data = response.json()
-            return json_data
+        response = await self._request('GET', f'{self.api_host}/1/clouddrive/file/sort', params=params,
+                                       headers=self.headers)
+        json_data = response.json()
+        if json_data.get('code') == 0:
+            self.metadata_cache.set(self.account_key, cache_scope, cache_params, json_data)
+        return json_data
+
+    async def list_dir(self, pdir_fid: str = '0', sort: str = 'file_type:asc,file_name:asc',
+                       use_cache: bool = True) -> list[dict[str, Any]]:
+        async def fetch_page(page: int) -> dict[str, Any]:
+            return await self.get_sorted_file_list(pdir_fid, page=str(page), size=str(self.page_size),
+                                                   fetch_total='1', sort=sort, use_cache=use_cache)
+
+        pages = await self._fetch_all_pages(fetch_page)
+        return [item for json_data in pages for item in json_data['data']['list']]
+
+    @staticmethod
+    def entry_key(item: dict[str, Any]) -> Union[tuple[str, int], None]:
+        # 文件按名称和大小判断是否已存在；文件夹返回 None，始终转存
+        if item.get('dir', item.get('file_type') == 0):
+            return None
+        return item['file_name'], int(item.get('size') or 0)
+
+    async def folder_index(self, folder_id: str) -> set[tuple[str, int]]:
+        # 保存目录中所有文件的 entry_key，列出一次后在 metadata_cache.ttl 内复用
+        async with self._folder_index_lock:
+            cached = self._folder_indexes.get(folder_id)
+            if cached is None or time.monotonic() - cached[0] > self.metadata_cache.ttl:
+                index = {key for i in await self.list_dir(folder_id, use_cache=False) if (key := self.entry_key(i))}
+                cached = self._folder_indexes[folder_id] = (time.monotonic(), index)
+            return cached[1]
+
+    async def skip_existing_entries(self, folder_id: str,
+                                    data_list: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], set[tuple]]:
+        # 去掉保存目录中已存在的文件，返回其余条目和为它们预留的 key
+        keys = {key for item in data_list if (key := self.entry_key(item))}
+        saving = self._saving_entries.setdefault(folder_id, {})
+        while True:
+            index = await self.folder_index(folder_id)
+            # 其他链接正在转存的同名文件，等它转存结束再判断是否已存在
+            events = {saving[key] for key in keys if key in saving}
+            if not events:
+                break
+            await asyncio.gather(*(event.wait() for event in events))
+        new, skipped, reserved = [], [], set()
+        for item in data_list:
+            key = self.entry_key(item)
+            if key is not None and key in index:
+                skipped.append(item["file_name"])
+                continue
+            new.append(item)
+            if key is not None:
+                reserved.add(key)
+        event = asyncio.Event()
+        saving.update(dict.fromkeys(reserved, event))
+        if skipped:
+            custom_print(f'保存目录中已存在{len(skipped)}个同名、同大小的文件，跳过：{skipped}')
+        return new, reserved
+
+    def release_entries(self, folder_id: str, reserved: set[tuple], saved: bool) -> None:
+        # 转存成功的 key 加入目录索引，并唤醒等待这些 key 的链接
+        cached = self._folder_indexes.get(folder_id)
+        if saved and cached is not None:
+            cached[1].update(reserved)
+        saving = self._saving_entries.get(folder_id, {})
+        for event in {saving.pop(key) for key in reserved if key in saving}:
+            event.set()
 
     async def get_user_info(self) -> str:
 
@@ -151,18 +475,16 @@ class QuarkPanFileManager:
             'platform': 'pc',
         }
 
-        async with httpx.AsyncClient() as client:
-            timeout = httpx.Timeout(60.0, connect=60.0)
-            response = await client.get('https://pan.quark.cn/account/info', params=params,
-                                        headers=self.headers, timeout=timeout)
-            json_data = response.json()
-            if json_data['data']:
-                nickname = json_data['data']['nickname']
-                return nickname
-            else:
-                input("登录失败！请重新运行本程序，然后在弹出的浏览器中登录夸克账号")
-                with open(f'{CONFIG_DIR}/cookies.txt', 'w', encoding='utf-8'):
-                    sys.exit(-1)
+        response = await self._request('GET', f'{self.account_host}/account/info', params=params,
+                                       headers=self.headers)
+        json_data = response.json()
+        if json_data['data']:
+            nickname = json_data['data']['nickname']
+            return nickname
+        else:
+            input("登录失败！请重新运行本程序，然后在弹出的浏览器中登录夸克账号")
+            with open(f'{CONFIG_DIR}/cookies.txt', 'w', encoding='utf-8'):
+                sys.exit(-1)
 
     async def create_dir(self, pdir_name='新建文件夹') -> None:
         params = {
@@ -180,44 +502,83 @@ class QuarkPanFileManager:
             'dir_init_lock': False,
         }
 
-        async with httpx.AsyncClient() as client:
-            timeout = httpx.Timeout(60.0, connect=60.0)
-            response = await client.post('https://drive-pc.quark.cn/1/clouddrive/file', params=params,
-                                         json=json_data, headers=self.headers, timeout=timeout)
-            json_data = response.json()
-            if json_data["code"] == 0:
-                custom_print(f'根目录下 {pdir_name} 文件夹创建成功！')
-                new_config = {'user': self.user, 'pdir_id': json_data["data"]["fid"], 'dir_name': pdir_name}
-                save_config(f'{CONFIG_DIR}/config.json', content=json.dumps(new_config, ensure_ascii=False))
-                global to_dir_id
-                to_dir_id = json_data["data"]["fid"]
-                custom_print(f"自动将保存目录切换至 {pdir_name} 文件夹")
-            elif json_data["code"] == 23008:
-                custom_print('文件夹同名冲突，请更换一个文件夹名称后重试', error_msg=True)
-            else:
-                custom_print(f"错误信息：{json_data['message']}", error_msg=True)
+        response = await self._request('POST', f'{self.api_host}/1/clouddrive/file', params=params,
+                                       json=json_data, headers=self.headers)
+        json_data = response.json()
+        if json_data["code"] == 0:
+            custom_print(f'根目录下 {pdir_name} 文件夹创建成功！')
+            self.metadata_cache.invalidate(self.account_key, 'drive:0')
+            self.pdir_id, self.dir_name = json_data["data"]["fid"], pdir_name
+            new_config = {'user': self.user, 'pdir_id': self.pdir_id, 'dir_name': self.dir_name}
+            save_config(f'{CONFIG_DIR}/config.json', content=json.dumps(new_config, ensure_ascii=False))
+            custom_print(f"自动将保存目录切换至 {pdir_name} 文件夹")
+        elif json_data["code"] == 23008:
+            custom_print('文件夹同名冲突，请更换一个文件夹名称后重试', error_msg=True)
+        else:
+            custom_print(f"错误信息：{json_data['message']}", error_msg=True)
 
-    async def run(self, input_line: str, folder_id: Union[str, None] = None, download: bool = False) -> None:
-        self.folder_id = folder_id
+    async def run(self, input_line: str, folder_id: Union[str, None] = None, download: bool = False,
+                  journal: bool = False) -> bool:
+        # journal 为 True 时记录每一步：已完成的链接直接跳过，已提交的转存任务继续查询，不重新转存
         share_url = input_line.strip()
+        journaling = journal and not download
+        job = self.journal.get(self.account_key, folder_id or '', share_url) if journaling else None
+        state = job['state'] if job else None
+
+        def record(new_state: str, **fields) -> None:
+            nonlocal state
+            state = new_state
+            if journaling:
+                self.journal.update(self.account_key, folder_id or '', share_url, new_state, **fields)
+
+        if state == DONE:
+            custom_print(f'该链接已转存完成，跳过：{share_url}')
+            return True
+        try:
+            if state == SAVING and job['task_id']:
+                custom_print(f'继续查询上次提交的转存任务：{job["task_id"]}')
+                ok = await self.finish_save_task(job['task_id'], folder_id, record)
+            else:
+                record(PENDING)
+                ok = await self.transfer_share(share_url, folder_id, download, record)
+        except QuarkApiError as e:
+            record(FAILED, code=e.code, message=e.message)
+            raise
+        except Exception as e:
+            if state != SAVING:  # 任务已提交时保留任务ID，下次继续查询
+                record(FAILED, message=repr(e))
+            raise
+        if not ok and state != SAVING:
+            record(FAILED, message='转存失败')
+        return ok
+
+    async def finish_save_task(self, task_id: str, folder_id: Union[str, None],
+                               record: Callable[..., None]) -> bool:
+        saved = bool(await self.submit_task(task_id))
+        if saved:
+            record(DONE)
+        self.metadata_cache.invalidate(self.account_key, f'drive:{folder_id}')
+        return saved
+
+    async def transfer_share(self, share_url: str, folder_id: Union[str, None], download: bool,
+                             record: Callable[..., None]) -> bool:
+        self.folder_id = folder_id
         custom_print(f'文件分享链接：{share_url}')
         match_password = re.search("pwd=(.*?)(?=$|&)", share_url)
         password = match_password.group(1) if match_password else ""
-        pwd_id = self.get_pwd_id(input_line).split("#")[0]
+        pwd_id = self.get_pwd_id(share_url).split("#")[0]
         if not pwd_id:
             custom_print('文件分享链接不可为空！', error_msg=True)
-            return
+            return False
         stoken = await self.get_stoken(pwd_id, password)
         if not stoken:
-            return
+            return False
+        record(STOKEN_OK)
         is_owner, data_list = await self.get_detail(pwd_id, stoken)
         files_count = 0
         folders_count = 0
         files_list: list[str] = []
         folders_list: list[str] = []
-        folders_map = {}
-        files_id_list = []
-        file_fid_list = []
 
         if data_list:
             total_files_count = len(data_list)
@@ -225,14 +586,9 @@ class QuarkPanFileManager:
                 if data['dir']:
                     folders_count += 1
                     folders_list.append(data["file_name"])
-                    folders_map[data["fid"]] = {
-                        "file_name": data["file_name"],
-                        "pdir_fid": data["pdir_fid"]
-                    }
                 else:
                     files_count += 1
                     files_list.append(data["file_name"])
-                    files_id_list.append((data["fid"], data["file_name"]))
 
             custom_print(f'转存总数：{total_files_count}，文件数：{files_count}，文件夹数：{folders_count} | 支持嵌套')
             custom_print(f'文件转存列表：{files_list}')
@@ -241,66 +597,91 @@ class QuarkPanFileManager:
             fid_list = [i["fid"] for i in data_list]
             share_fid_token_list = [i["share_fid_token"] for i in data_list]
 
-            if not self.folder_id:
+            if not folder_id:
                 custom_print('保存目录ID不合法，请重新获取，如果无法获取，请输入0作为文件夹ID')
-                return
+                return False
 
             if download:
                 if is_owner == 0:
                     custom_print(
                         '下载文件必须是自己的网盘内文件，请先将文件转存至网盘中，然后再从自己网盘中获取分享地址进行下载')
+                    return False
+
+                await self.download_share(pwd_id, stoken, data_list)
+                print()
+                return True
+
+            if is_owner == 1:
+                custom_print('网盘中已经存在该文件，无需再次转存')
+                record(DONE)
+                return True
+            reserved: set[tuple] = set()
+            if self.skip_existing:
+                data_list, reserved = await self.skip_existing_entries(folder_id, data_list)
+                if not data_list:
+                    custom_print('分享内容在保存目录中均已存在，无需转存')
+                    record(DONE)
+                    return True
+                fid_list = [i["fid"] for i in data_list]
+                share_fid_token_list = [i["share_fid_token"] for i in data_list]
+            saved = False
+            try:
+                task_id = await self.get_share_save_task_id(pwd_id, stoken, fid_list, share_fid_token_list,
+                                                            to_pdir_fid=folder_id)
+                record(SAVING, task_id=task_id)
+                saved = await self.finish_save_task(task_id, folder_id, record)
+            finally:
+                self.release_entries(folder_id, reserved, saved)
+            print()
+            return saved
+        return False
+
+    async def batch_run(self, urls: list[str], folder_id: Union[str, None] = None,
+                        concurrency: Union[int, None] = None) -> list[dict[str, Any]]:
+        # 最多 concurrency 条链接同时转存；链接记录在 journal 中，重新运行时跳过已完成的链接
+        concurrency = concurrency or self.transfer_concurrency
+        self.journal.add(self.account_key, folder_id or '', urls)
+        self._folder_indexes.pop(folder_id or '', None)  # 每批重新列出保存目录
+        results: list[dict[str, Any]] = [{'url': url, 'ok': False, 'error': '未执行'} for url in urls]
+        pending = iter(enumerate(urls))
+        stopped = False
+
+        async def worker() -> None:
+            nonlocal stopped
+            for index, url in pending:
+                if stopped:
                     return
+                custom_print(f'正在转存第{index + 1}/{len(urls)}个')
+                try:
+                    ok = await self.run(url, folder_id, journal=True)
+                    results[index].update(ok=ok, error='' if ok else '转存失败')
+                except QuarkApiError as e:
+                    results[index]['error'] = e.message
+                    if e.code in (32003, 41013):  # 容量不足或保存目录不存在，后续链接必然失败
+                        stopped = True
+                except Exception as e:
+                    results[index]['error'] = repr(e)
 
-                for i in data_list:
-                    if i['dir']:
-                        data_list2 = [i]
-                        not_dir = False
-                        while True:
-                            data_list3 = []
-                            for i2 in data_list2:
-                                custom_print(f'开始下载：{i2["file_name"]} 文件夹中的{i2["include_items"]}个文件')
-                                is_owner, file_data_list = await self.get_detail(pwd_id, stoken, pdir_fid=i2['fid'])
-
-                                # record folder's fid start
-                                if file_data_list:
-                                    for data in file_data_list:
-                                        if data['dir']:
-                                            folders_map[data["fid"]] = {
-                                                "file_name": data["file_name"],
-                                                "pdir_fid": data["pdir_fid"]
-                                            }
-
-                                # record folder's fid stop
-                                folder = i["file_name"]
-                                fid_list = [i["fid"] for i in file_data_list]
-                                await self.quark_file_download(fid_list, folder=folder, folders_map=folders_map)
-                                file_fid_list.extend([i for i in file_data_list if not i2['dir']])
-                                dir_list = [i for i in file_data_list if i['dir']]
-
-                                if not dir_list:
-                                    not_dir = True
-                                data_list3.extend(dir_list)
-                            data_list2 = data_list3
-                            if not data_list2 or not_dir:
-                                break
-
-                if len(files_id_list) > 0 or len(file_fid_list) > 0:
-                    fid_list = [i[0] for i in files_id_list]
-                    file_fid_list.extend(fid_list)
-                    await self.quark_file_download(file_fid_list, folder='.', folders_map=folders_map)
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, len(urls)))))
+        self.print_batch_summary(results)
+        return results
 
-            else:
-                if is_owner == 1:
-                    custom_print('网盘中已经存在该文件，无需再次转存')
-                    return
-                task_id = await self.get_share_save_task_id(pwd_id, stoken, fid_list, share_fid_token_list,
-                                                            to_pdir_fid=self.folder_id)
-                await self.submit_task(task_id)
-            print()
+    @staticmethod
+    def print_batch_summary(results: list[dict[str, Any]]) -> None:
+        succeeded = sum(1 for i in results if i['ok'])
+        skipped = sum(1 for i in results if i['error'] == '未执行')
+        failed = len(results) - succeeded - skipped
+        custom_print(f'批量转存完成，共{len(results)}条链接，成功：{succeeded}，失败：{failed}，未执行：{skipped}')
+        if failed or skipped:
+            table = PrettyTable(['序号', '分享链接', '失败原因'])
+            for idx, item in enumerate(results, 1):
+                if not item['ok']:
+                    table.add_row([idx, item['url'], item['error']])
+            print(table)
 
     async def get_share_save_task_id(self, pwd_id: str, stoken: str, first_ids: list[str], share_fid_tokens: list[str],
                                      to_pdir_fid: str = '0') -> str:
-        task_url = "https://drive.quark.cn/1/clouddrive/share/sharepage/save"
+        task_url = f"{self.save_host}/1/clouddrive/share/sharepage/save"
         params = {
             "pr": "ucpro",
             "fr": "pc",
@@ -313,31 +694,66 @@ class QuarkPanFileManager:
                 "to_pdir_fid": to_pdir_fid, "pwd_id": pwd_id,
                 "stoken": stoken, "pdir_fid": "0", "scene": "link"}
 
-        async with httpx.AsyncClient() as client:
-            timeout = httpx.Timeout(60.0, connect=60.0)
-            response = await client.post(task_url, json=data, headers=self.headers, params=params, timeout=timeout)
-            json_data = response.json()
-            task_id = json_data['data']['task_id']
-            custom_print(f'获取任务ID：{task_id}')
-            return task_id
+        response = await self._request('POST', task_url, json=data, headers=self.headers, params=params)
+        json_data = response.json()
+        if not json_data.get('data'):
+            error = QuarkApiError(json_data.get('code'), json_data.get('message', ''))
+            self.print_save_error(error)
+            raise error
+        task_id = json_data['data']['task_id']
+        custom_print(f'获取任务ID：{task_id}')
+        return task_id
+
+    async def download_file(self, download_url: str, save_path: str, headers: dict,
+                            expected: Union[dict[str, Any], None] = None) -> dict[str, Any]:
+        return await self.downloader.download(download_url, save_path, headers, expected)
+
+    async def download_share(self, pwd_id: str, stoken: str, data_list: list[dict[str, Any]]) -> None:
+        # 遍历子文件夹的同时，把每个列出的文件夹中的文件提交给下载流水线
+        folder_paths: dict[str, str] = {}
+        pipeline = self.new_download_pipeline()
+        manifest = DownloadManifest(self.download_dir) if self.incremental_download else None
+        transfers = asyncio.create_task(self.run_download_pipeline(pipeline, folder_paths, manifest))
+        skipped = 0
+
+        def submit(files: list[dict[str, Any]], path: str) -> None:
+            nonlocal skipped
+            for i in files:
+                if manifest:
+                    save_path = os.path.join(self.download_dir, path, i["file_name"])
+                    if manifest.is_current(i, save_path):
+                        skipped += 1
+                        continue
+                    manifest.expect(i, save_path)
+                pipeline.submit(i["fid"], path)
+                self.progress.expect()
 
-    @staticmethod
-    async def download_file(download_url: str, save_path: str, headers: dict) -> None:
-        async with httpx.AsyncClient() as client:
-            timeout = httpx.Timeout(60.0, connect=60.0)
-            async with client.stream("GET", download_url, headers=headers, timeout=timeout) as response:
-                if response.headers.get("content-length") is None:
-                    response.headers["content-length"] = "0"
-                with open(save_path, "wb") as f:
-                    with tqdm(unit="B", unit_scale=True,
-                              desc=os.path.basename(save_path),
-                              ncols=80) as pbar:
-                        async for chunk in response.aiter_bytes():
-                            f.write(chunk)
-                            pbar.update(len(chunk))
-
-    async def quark_file_download(self, fids: list[str], folder: str = '', folders_map=None) -> None:
-        folders_map = folders_map or {}
+        async def list_share_dir(fid: str) -> list[dict[str, Any]]:
+            _, file_list = await self.get_detail(pwd_id, stoken, pdir_fid=fid)
+            return file_list
+
+        try:
+            submit([i for i in data_list if not i["dir"]], '')
+            roots = [(i["fid"], i["file_name"]) for i in data_list if i["dir"]]
+            folder_paths.update(roots)
+            async for folder in walk_tree(list_share_dir, roots, workers=self.list_concurrency):
+                if folder.error:
+                    custom_print(f'{folder.path} 文件夹列表获取失败：{folder.error!r}', error_msg=True)
+                    continue
+                folder_paths.update((i["fid"], join_path(folder.path, i["file_name"]))
+                                    for i in folder.entries if i["dir"])
+                files = [i for i in folder.entries if not i["dir"]]
+                custom_print(f'开始下载：{folder.path} 文件夹中的{len(files)}个文件')
+                submit(files, folder.path)
+        finally:
+            pipeline.close()
+            await transfers
+            if manifest:
+                manifest.save(force=True)
+        if skipped:
+            custom_print(f'跳过{skipped}个本地已是最新的文件')
+
+    async def get_download_urls(self, fids: list[str]) -> list[dict[str, Any]]:
         params = {
             'pr': 'ucpro',
             'fr': 'pc',
@@ -351,9 +767,7 @@ class QuarkPanFileManager:
             'fids': fids
         }
         headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
-                          "Chrome/143.0.0.0 Safari/537.36 Edg/143.0.0.0",
-
+            "User-Agent": self.download_user_agent,
             "Accept": "application/json, text/plain, */*",
             "Content-Type": "application/json",
             "accept-language": "zh-CN",
@@ -362,90 +776,157 @@ class QuarkPanFileManager:
             "cookie": self.cookies
         }
 
-        download_api = 'https://drive-pc.quark.cn/1/clouddrive/file/download'
+        download_api = f'{self.api_host}/1/clouddrive/file/download'
 
         for _ in range(2):
-            async with httpx.AsyncClient() as client:
-                timeout = httpx.Timeout(60.0, connect=60.0)
-                response = await client.post(download_api, json=data, headers=headers, params=params, timeout=timeout)
-                json_data = response.json()
+            response = await self._request('POST', download_api, json=data, headers=headers, params=params,
+                                           idempotent=True)
+            json_data = response.json()
 
-                if json_data.get('code') == 23018:
-                    headers['User-Agent'] = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                                             "(KHTML, like Gecko) quark-cloud-drive/2.5.56 Chrome/100.0.4896.160 "
-                                             "Electron/18.3.5.12-a038f7b798 Safari/537.36 Channel/pckk_other_ch")
-                    continue
+            if json_data.get('code') == 23018:
+                # 网页端 UA 受限时换用客户端 UA，并在本次会话中沿用
+                self.download_user_agent = headers['User-Agent'] = (
+                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                    "(KHTML, like Gecko) quark-cloud-drive/2.5.56 Chrome/100.0.4896.160 "
+                    "Electron/18.3.5.12-a038f7b798 Safari/537.36 Channel/pckk_other_ch")
+                continue
+
+            if json_data['status'] != 200:
+                raise QuarkApiError(json_data.get('code'), json_data['message'])
+            return json_data.get('data') or []
+        raise QuarkApiError(23018, '下载地址获取失败')
+
+    def new_download_pipeline(self) -> DownloadUrlPipeline:
+        resolve = functools.partial(self.retry_policy.call, self.get_download_urls, description='获取下载地址')
+        return DownloadUrlPipeline(resolve, chunk_size=self.download_batch_size,
+                                   lookahead=self.download_lookahead, max_age=self.download_url_max_age)
+
+    async def run_download_pipeline(self, pipeline: DownloadUrlPipeline,
+                                    folder_paths: Union[dict[str, str], None] = None,
+                                    manifest: Union[DownloadManifest, None] = None) -> None:
+        folder_paths = folder_paths or {}
+        failed = []
+
+        async def worker() -> None:
+            while (entry := await pipeline.get()) is not None:
+                base_path = entry["folder"] or folder_paths.get(entry.get("pdir_fid"), '')
+                final_save_folder = os.path.join(self.download_dir, base_path)
+                os.makedirs(final_save_folder, exist_ok=True)
+                save_path = os.path.join(final_save_folder, entry["file_name"])
+                checksums = await self.download_file_with_retry(entry, save_path, pipeline)
+                if checksums is None:
+                    failed.append(entry["file_name"])
+                elif manifest:
+                    manifest.record(entry["fid"], save_path, checksums)
+
+        resolver = asyncio.create_task(pipeline.run())
+        try:
+            async with self.progress:
+                await asyncio.gather(*(worker() for _ in range(self.download_concurrency)))
+        finally:
+            resolver.cancel()
+            await asyncio.gather(resolver, return_exceptions=True)
+        if pipeline.failed:
+            custom_print(f'{len(pipeline.failed)}个文件未能获取下载地址：{pipeline.failed}', error_msg=True)
+        if failed:
+            custom_print(f'{len(failed)}个文件下载失败：{failed}', error_msg=True)
+
+    async def quark_file_download(self, fids: list[str], folder: str = '',
+                                  folder_paths: Union[dict[str, str], None] = None) -> None:
+        pipeline = self.new_download_pipeline()
+        for fid in fids:
+            pipeline.submit(fid, folder)
+        pipeline.close()
+        self.progress.expect(len(fids))
+        await self.run_download_pipeline(pipeline, folder_paths)
+
+    @property
+    def download_headers(self) -> dict[str, str]:
+        return {
+            "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, "
+                          "like Gecko) Chrome/143.0.0.0 Safari/537.36 Edg/143.0.0.0",
+            "origin": "https://pan.quark.cn",
+            "referer": "https://pan.quark.cn/",
+            "cookie": self.cookies
+        }
 
-                data_list = json_data.get('data', None)
-                if json_data['status'] != 200:
-                    custom_print(f"文件下载地址列表获取失败, {json_data['message']}", error_msg=True)
-                    return
-                elif data_list:
-                    custom_print('文件下载地址列表获取成功')
-
-                save_folder = 'downloads'  # if folder else 'downloads'
-                os.makedirs(save_folder, exist_ok=True)
-                n = 0
-                for i in data_list:
-                    n += 1
-                    filename = i["file_name"]
-                    custom_print(f'开始下载第{n}个文件-{filename}')
-
-                    # build save path start
-                    base_path = ""
-                    if "pdir_fid" in i:
-                        pdir_fid = i["pdir_fid"]
-                        while pdir_fid in folders_map:
-                            base_path = "/" + folders_map[pdir_fid]["file_name"] + base_path
-                            pdir_fid = folders_map[pdir_fid]["pdir_fid"]
-                    final_save_folder = f"{save_folder}/{base_path}"
-                    os.makedirs(final_save_folder, exist_ok=True)
-                    # build save path stop
-
-                    download_url = i["download_url"]
-                    save_path = os.path.join(final_save_folder, filename)
-                    headers = {
-                        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, "
-                                      "like Gecko) Chrome/143.0.0.0 Safari/537.36 Edg/143.0.0.0",
-                        "origin": "https://pan.quark.cn",
-                        "referer": "https://pan.quark.cn/",
-                        "cookie": self.cookies
-                    }
-                    await self.download_file(download_url, save_path, headers=headers)
-            return
+    async def download_file_with_retry(self, entry: dict[str, Any], save_path: str,
+                                       pipeline: Union[DownloadUrlPipeline, None] = None
+                                       ) -> Union[dict[str, Any], None]:
+        # 下载地址过期或返回 403/410 时重新获取，其他失败按 retry_policy 重试，共 download_retries 次；失败返回 None
+        filename = os.path.basename(save_path)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                if pipeline and pipeline.is_stale(entry):
+                    entry = await pipeline.refresh(entry)
+                async with self.download_semaphore:
+                    if not self.progress.enabled:
+                        custom_print(f'开始下载第{entry.get("index", 1)}个文件-{filename}')
+                    checksums = await self.download_file(entry["download_url"], save_path,
+                                                         headers=self.download_headers, expected=entry)
+                    self.metrics.observe_file(True)
+                    self.progress.finish(True)
+                    return checksums
+            except (httpx.HTTPError, QuarkApiError, OSError, ValueError) as e:
+                error = e
+            if (isinstance(error, httpx.HTTPStatusError) and error.response.status_code in (403, 410) and pipeline
+                    and attempt < self.download_retries):
+                custom_print(f'{filename} 下载地址已失效（HTTP {error.response.status_code}），重新获取后重试')
+                entry["issued_at"] = float('-inf')
+                continue
+            delay = self.retry_policy.backoff(error, attempt)
+            if delay is None or attempt >= self.download_retries:
+                custom_print(f'{filename} 下载失败（第{attempt}次，{self.retry_policy.classify(error)}）：{error!r}',
+                             error_msg=True)
+                self.metrics.observe_file(False)
+                self.progress.finish(False)
+                return None
+            custom_print(f'{filename} 下载失败（第{attempt}次）：{error!r}，{delay:.1f}秒后重试', error_msg=True)
+            await asyncio.sleep(delay)  # .part 文件保留已下载部分，重试时断点续传
+
+    async def query_task(self, task_id: str, retry_index: int = 0) -> dict[str, Any]:
+        params = {
+            'pr': 'ucpro',
+            'fr': 'pc',
+            'uc_param_str': '',
+            'task_id': task_id,
+            'retry_index': retry_index,
+            '__dt': 21192,
+            '__t': get_timestamp(13),
+        }
+        response = await self._request('GET', f'{self.api_host}/1/clouddrive/task', params=params,
+                                       headers=self.headers)
+        return response.json()
+
+    def print_save_error(self, e: QuarkApiError) -> None:
+        if e.code == 32003 and 'capacity limit' in e.message:
+            custom_print("转存失败，网盘容量不足！批量转存已完成的链接会记录下来，清理空间后重新运行即可跳过",
+                         error_msg=True)
+        elif e.code == 41013:
+            custom_print(f"”{self.dir_name}“ 网盘文件夹不存在，请重新运行按3切换保存目录后重试！", error_msg=True)
+        else:
+            custom_print(f"错误信息：{e.message}", error_msg=True)
 
     async def submit_task(self, task_id: str, retry: int = 50) -> bool | dict:
-
-        for i in range(retry):
-            await asyncio.sleep(random.randint(500, 1000) / 1000)
-            custom_print(f'第{i + 1}次提交任务')
-            submit_url = (f"https://drive-pc.quark.cn/1/clouddrive/task?pr=ucpro&fr=pc&uc_param_str=&task_id={task_id}"
-                          f"&retry_index={i}&__dt=21192&__t={get_timestamp(13)}")
-
-            async with httpx.AsyncClient() as client:
-                timeout = httpx.Timeout(60.0, connect=60.0)
-                response = await client.get(submit_url, headers=self.headers, timeout=timeout)
-                json_data = response.json()
-
-            if json_data['message'] == 'ok':
-                if json_data['data']['status'] == 2:
-                    if 'to_pdir_name' in json_data['data']['save_as']:
-                        folder_name = json_data['data']['save_as']['to_pdir_name']
-                    else:
-                        folder_name = ' 根目录'
-                    if json_data['data']['task_title'] == '分享-转存':
-                        custom_print(f"结束任务ID：{task_id}")
-                        custom_print(f'文件保存位置：{folder_name} 文件夹')
-                    return json_data
-            else:
-                if json_data['code'] == 32003 and 'capacity limit' in json_data['message']:
-                    custom_print("转存失败，网盘容量不足！请注意当前已成功保存的个数，避免重复保存", error_msg=True)
-                elif json_data['code'] == 41013:
-                    custom_print(f"”{to_dir_name}“ 网盘文件夹不存在，请重新运行按3切换保存目录后重试！", error_msg=True)
-                else:
-                    custom_print(f"错误信息：{json_data['message']}", error_msg=True)
-                input(f'[{get_datetime()}] 已退出程序')
-                sys.exit()
+        try:
+            json_data = await self.task_poller.wait(task_id, max_polls=retry)
+        except TimeoutError as e:
+            custom_print(str(e), error_msg=True)
+            return False
+        except QuarkApiError as e:
+            self.print_save_error(e)
+            raise
+
+        if 'to_pdir_name' in json_data['data']['save_as']:
+            folder_name = json_data['data']['save_as']['to_pdir_name']
+        else:
+            folder_name = ' 根目录'
+        if json_data['data']['task_title'] == '分享-转存':
+            custom_print(f"结束任务ID：{task_id}")
+            custom_print(f'文件保存位置：{folder_name} 文件夹')
+        return json_data
 
     def init_config(self, _user, _pdir_id, _dir_name):
         try:
@@ -466,29 +947,89 @@ class QuarkPanFileManager:
             save_config(f'{CONFIG_DIR}/config.json', content=json.dumps(new_config, ensure_ascii=False))
         return _user, _pdir_id, _dir_name
 
+    async def refresh_drive_index(self, full: Union[bool, None] = None) -> dict[str, int]:
+        async def list_dir(fid: str) -> list[dict[str, Any]]:
+            return await self.list_dir(fid, use_cache=False)
+
+        return await self.drive_index.refresh(self.account_key, list_dir, workers=self.drive_index_concurrency,
+                                              full=full)
+
+    def start_drive_index_refresh(self, full: Union[bool, None] = None) -> bool:
+        # 已禁用或正在更新时不再启动
+        if not self.drive_index.enabled or (self._drive_index_thread and self._drive_index_thread.is_alive()):
+            return False
+        self._drive_index_thread = threading.Thread(target=self._refresh_drive_index_in_thread, args=(full,),
+                                                    daemon=True)
+        self._drive_index_thread.start()
+        return True
+
+    def _refresh_drive_index_in_thread(self, full: Union[bool, None]) -> None:
+        # 后台线程使用自己的事件循环、连接池和数据库连接，遍历网盘时不阻塞菜单
+        manager = QuarkPanFileManager(cookies=self.cookies, use_metadata_cache=False, use_journal=False,
+                                      progress='off', max_connections_per_host=self.max_connections_per_host,
+                                      page_size=self.page_size, drive_index_concurrency=self.drive_index_concurrency)
+        manager.api_host, manager.save_host, manager.account_host = self.api_host, self.save_host, self.account_host
+        manager.drive_index = DriveIndex(self.drive_index.path, full_interval=self.drive_index.full_interval)
+
+        async def refresh() -> None:
+            try:
+                await manager.refresh_drive_index(full)
+            finally:
+                await manager.close()
+
+        try:
+            asyncio.run(refresh())
+        except Exception as e:
+            custom_print(f'网盘目录索引更新失败：{e!r}', error_msg=True)
+
+    async def find_folders(self, query: str = '') -> list[tuple[str, str]]:
+        # 按文件夹ID、路径或名称查找可选的保存目录
+        account = self.account_key
+        state = self.drive_index.state(account)
+        if state is None or time.time() - state['refreshed_at'] > self.drive_index_interval:
+            # 本次先用已有的索引回答，索引在后台更新，下次切换时生效
+            if self.start_drive_index_refresh() and state is None:
+                custom_print('正在后台建立网盘目录索引，建立完成前只能从根目录第一页的文件夹中选择')
+        if state is None:
+            file_list_data = await self.get_sorted_file_list()
+            return [(i['fid'], i['file_name']) for i in file_list_data['data']['list']
+                    if i.get('dir') and (not query or query == i['fid'] or query in i['file_name'])]
+
+        if not query:
+            rows = self.drive_index.children(account, dirs_only=True)
+        elif (row := self.drive_index.get(account, query)) and row['is_dir']:
+            rows = [row]
+        elif '/' in query:
+            fid = self.drive_index.resolve(account, query)
+            rows = [row] if fid and (row := self.drive_index.get(account, fid)) and row['is_dir'] else []
+        else:
+            rows = self.drive_index.search(account, query, dirs_only=True, limit=self.folder_search_limit)
+        return [(row['fid'], self.drive_index.path_of(account, row['fid']) or row['name']) for row in rows]
+
     async def load_folder_id(self, renew=False) -> Union[tuple, None]:
 
-        self.user = await self.get_user_info()
-        self.user, self.pdir_id, self.dir_name = self.init_config(self.user, self.pdir_id, self.dir_name)
+        if renew or not self.session.fresh:
+            self.user = await self.get_user_info()
+            self.user, self.pdir_id, self.dir_name = self.init_config(self.user, self.pdir_id, self.dir_name)
+            self.session.validated()
         if not renew:
             custom_print(f'用户名：{self.user}')
             custom_print(f'你当前选择的网盘保存目录: {self.dir_name} 文件夹')
 
         if renew:
-            pdir_id = input(f'[{get_datetime()}] 请输入保存位置的文件夹ID(可为空): ')
+            pdir_id = input(f'[{get_datetime()}] 请输入保存位置的文件夹ID、路径或名称(可为空): ')
             if pdir_id == '0':
-                self.dir_name = '根目录'
+                self.pdir_id, self.dir_name = '0', '根目录'
                 new_config = {'user': self.user, 'pdir_id': self.pdir_id, 'dir_name': self.dir_name}
                 save_config(f'{CONFIG_DIR}/config.json', content=json.dumps(new_config, ensure_ascii=False))
 
-            elif len(pdir_id) < 32:
-                file_list_data = await self.get_sorted_file_list()
-                fd_list = file_list_data['data']['list']
-                fd_list = [{i['fid']: i['file_name']} for i in fd_list if i.get('dir')]
+            else:
+                fd_list = await self.find_folders(pdir_id.strip())
+                if not fd_list and pdir_id.strip():
+                    custom_print(f'没有找到与 {pdir_id.strip()} 匹配的文件夹，保存目录未切换', error_msg=True)
                 if fd_list:
                     table = PrettyTable(['序号', '文件夹ID', '文件夹名称'])
-                    for idx, item in enumerate(fd_list, 1):
-                        key, value = next(iter(item.items()))
+                    for idx, (key, value) in enumerate(fd_list, 1):
                         table.add_row([idx, key, value])
                     print(table)
                     num = input(f'[{get_datetime()}] 请选择你要保存的位置（输入对应序号）: ')
@@ -497,8 +1038,7 @@ class QuarkPanFileManager:
                         json_data = read_config(f'{CONFIG_DIR}/config.json', 'json')
                         return json_data['pdir_id'], json_data['dir_name']
 
-                    item = fd_list[int(num) - 1]
-                    self.pdir_id, self.dir_name = next(iter(item.items()))
+                    self.pdir_id, self.dir_name = fd_list[int(num) - 1]
                     new_config = {'user': self.user, 'pdir_id': self.pdir_id, 'dir_name': self.dir_name}
                     save_config(f'{CONFIG_DIR}/config.json', content=json.dumps(new_config, ensure_ascii=False))
 
@@ -528,27 +1068,16 @@ class QuarkPanFileManager:
             'uc_param_str': '',
         }
 
-        async with httpx.AsyncClient() as client:
-            timeout = httpx.Timeout(60.0, connect=60.0)
-            response = await client.post('https://drive-pc.quark.cn/1/clouddrive/share', params=params,
-                                         json=json_data, headers=self.headers, timeout=timeout)
-            json_data = response.json()
-            return json_data['data']['task_id']
+        response = await self._request('POST', f'{self.api_host}/1/clouddrive/share', params=params,
+                                       json=json_data, headers=self.headers)
+        json_data = response.json()
+        if not json_data.get('data'):
+            raise QuarkApiError(json_data.get('code'), json_data.get('message', ''))
+        return json_data['data']['task_id']
 
     async def get_share_id(self, task_id: str) -> str:
-        params = {
-            'pr': 'ucpro',
-            'fr': 'pc',
-            'uc_param_str': '',
-            'task_id': task_id,
-            'retry_index': '0',
-        }
-        async with httpx.AsyncClient() as client:
-            timeout = httpx.Timeout(60.0, connect=60.0)
-            response = await client.get('https://drive-pc.quark.cn/1/clouddrive/task', params=params,
-                                        headers=self.headers, timeout=timeout)
-            json_data = response.json()
-            return json_data['data']['share_id']
+        json_data = await self.task_poller.wait(task_id)
+        return json_data['data']['share_id']
 
     async def submit_share(self, share_id: str) -> tuple:
         params = {
@@ -560,29 +1089,85 @@ class QuarkPanFileManager:
         json_data = {
             'share_id': share_id,
         }
-        async with httpx.AsyncClient() as client:
-            timeout = httpx.Timeout(60.0, connect=60.0)
-            response = await client.post('https://drive-pc.quark.cn/1/clouddrive/share/password', params=params,
-                                         json=json_data, headers=self.headers, timeout=timeout)
-            json_data = response.json()
-            share_url = json_data['data']['share_url']
-            title = json_data['data']['title']
-            if 'passcode' in json_data['data']:
-                share_url = share_url + f"?pwd={json_data['data']['passcode']}"
-            return share_url, title
+        response = await self._request('POST', f'{self.api_host}/1/clouddrive/share/password', params=params,
+                                       json=json_data, headers=self.headers, idempotent=True)
+        json_data = response.json()
+        if not json_data.get('data'):
+            raise QuarkApiError(json_data.get('code'), json_data.get('message', ''))
+        share_url = json_data['data']['share_url']
+        title = json_data['data']['title']
+        if 'passcode' in json_data['data']:
+            share_url = share_url + f"?pwd={json_data['data']['passcode']}"
+        return share_url, title
+
+    async def share_folder(self, fid: str, title: str, url_type: int = 1, expired_type: int = 2,
+                           password: str = '') -> str:
+        await self.share_limiter.acquire()
+        task_id = await self.get_share_task_id(fid, title, url_type=url_type, expired_type=expired_type,
+                                               password=password)
+        share_id = await self.get_share_id(task_id)
+        share_url, _ = await self.submit_share(share_id)
+        return share_url
+
+    async def share_folders(self, jobs: AsyncIterator[tuple[str, str]], save_share_path: str,
+                            url_type: int = 1, expired_type: int = 2, password: str = '',
+                            retry_path: str = './share/retry.txt') -> tuple[int, int]:
+        # 结果按任务编号顺序写入：成功写入 save_share_path，失败写入 retry_path；返回任务数和失败数
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.share_concurrency * 2)
+        results: dict[int, tuple[str, str, Union[str, None], Union[Exception, None]]] = {}
+        next_n = 1
+        total = 0
+        error = 0
+
+        def flush() -> None:
+            nonlocal next_n, error
+            while next_n in results:
+                fid, path, share_url, share_error_msg = results.pop(next_n)
+                if share_url:
+                    with open(save_share_path, 'a', encoding='utf-8') as f:
+                        f.write(f'{next_n} | {path} | {share_url}\n')
+                else:
+                    error += 1
+                    print('分享失败：', share_error_msg)
+                    save_config('./share/share_error.txt', content=f'{error}.{path} 文件夹\n', mode='a')
+                    save_config(retry_path, content=f'{next_n} | {path} | {fid}\n', mode='a')
+                next_n += 1
+
+        async def worker() -> None:
+            while (job := await queue.get()) is not None:
+                n, fid, path = job
+                custom_print(f'{n}.开始分享 {path} 文件夹')
+                share_url, share_error_msg = None, None
+                try:
+                    share_url = await self.retry_policy.call(
+                        self.share_folder, fid, path.rsplit('/', 1)[-1], url_type=url_type, expired_type=expired_type,
+                        password=password, description=f'{n}.分享 {path} 文件夹')
+                    custom_print(f'{n}.分享成功 {path} 文件夹')
+                except Exception as e:
+                    share_error_msg = e
+                results[n] = (fid, path, share_url, share_error_msg)
+                flush()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.share_concurrency)]
+        try:
+            async for fid, path in jobs:
+                total += 1
+                await queue.put((total, fid, path))
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        return total, error
 
     async def share_run(self, share_url: str, folder_id: Union[str, None] = None, url_type: int = 1,
-                        expired_type: int = 2, password: str = '', traverse_depth: int = 2) -> None:
-        first_dir = ''
-        second_dir = ''
+                        expired_type: int = 2, password: str = '', traverse_depth: int = 2,
+                        leaf_only: bool = False) -> tuple[int, int]:
+        # traverse_depth 为 0 时分享根目录本身，否则分享第 traverse_depth 级目录，leaf_only 时分享所有最末级目录
         try:
             self.folder_id = folder_id
             custom_print(f'文件夹网页地址：{share_url}')
             pwd_id = share_url.rsplit('/', maxsplit=1)[1].split('-')[0]
 
-            first_page = 1
-            n = 0
-            error = 0
             os.makedirs('share', exist_ok=True)
             save_share_path = 'share/share_url.txt'
 
@@ -591,7 +1176,7 @@ class QuarkPanFileManager:
                 pass
 
             # 如果遍历深度为0，直接分享根目录
-            if traverse_depth == 0:
+            if traverse_depth == 0 and not leaf_only:
                 try:
                     custom_print('开始分享页面中所有根目录')
                     task_id = await self.get_share_task_id(pwd_id, "根目录", url_type=url_type,
@@ -603,151 +1188,58 @@ class QuarkPanFileManager:
                         content = f'1 | {title} | {share_url}'
                         f.write(content + '\n')
                         custom_print(f'分享 {title} 成功')
-                    return
+                    return 1, 0
                 except Exception as e:
                     print('分享失败：', e)
-                    return
-
-            while True:
-                json_data = await self.get_sorted_file_list(pwd_id, page=str(first_page), size='50', fetch_total='1',
-                                                            sort='file_type:asc,file_name:asc')
-                for i1 in json_data['data']['list']:
-                    if i1['dir']:
-                        first_dir = i1['file_name']
-                        # 如果遍历深度为1，直接分享一级目录
-                        if traverse_depth == 1:
-                            n += 1
-                            share_success = False
-                            share_error_msg = ''
-                            fid = ''
-                            for i in range(3):
-                                try:
-                                    custom_print(f'{n}.开始分享 {first_dir} 文件夹')
-                                    random_time = random.choice([0.5, 1, 1.5, 2])
-                                    await asyncio.sleep(random_time)
-                                    fid = i1['fid']
-                                    task_id = await self.get_share_task_id(fid, first_dir, url_type=url_type,
-                                                                           expired_type=expired_type,
-                                                                           password=password)
-                                    share_id = await self.get_share_id(task_id)
-                                    share_url, title = await self.submit_share(share_id)
-                                    with open(save_share_path, 'a', encoding='utf-8') as f:
-                                        content = f'{n} | {first_dir} | {share_url}'
-                                        f.write(content + '\n')
-                                        custom_print(f'{n}.分享成功 {first_dir} 文件夹')
-                                        share_success = True
-                                        break
-                                except Exception as e:
-                                    share_error_msg = e
-                                    error += 1
-
-                            if not share_success:
-                                print('分享失败：', share_error_msg)
-                                save_config('./share/share_error.txt',
-                                            content=f'{error}.{first_dir} 文件夹\n', mode='a')
-                                save_config('./share/retry.txt',
-                                            content=f'{n} | {first_dir} | {fid}\n', mode='a')
-                            continue
-
-                        # 遍历深度为2，遍历二级目录
-                        second_page = 1
-                        while True:
-                            # print(f'正在获取{first_dir}第{first_page}页，二级目录第{second_page}页，目前共分享{n}文件')
-                            json_data2 = await self.get_sorted_file_list(i1['fid'], page=str(second_page),
-                                                                         size='50', fetch_total='1',
-                                                                         sort='file_type:asc,file_name:asc')
-                            for i2 in json_data2['data']['list']:
-                                if i2['dir']:
-                                    n += 1
-                                    share_success = False
-                                    share_error_msg = ''
-                                    fid = ''
-                                    for i in range(3):
-                                        try:
-                                            second_dir = i2['file_name']
-                                            custom_print(f'{n}.开始分享 {first_dir}/{second_dir} 文件夹')
-                                            random_time = random.choice([0.5, 1, 1.5, 2])
-                                            await asyncio.sleep(random_time)
-                                            # print('获取到文件夹ID：', i2['fid'])
-                                            fid = i2['fid']
-                                            task_id = await self.get_share_task_id(fid, second_dir, url_type=url_type,
-                                                                                   expired_type=expired_type,
-                                                                                   password=password)
-                                            share_id = await self.get_share_id(task_id)
-                                            share_url, title = await self.submit_share(share_id)
-                                            with open(save_share_path, 'a', encoding='utf-8') as f:
-                                                content = f'{n} | {first_dir} | {second_dir} | {share_url}'
-                                                f.write(content + '\n')
-                                                custom_print(f'{n}.分享成功 {first_dir}/{second_dir} 文件夹')
-                                                share_success = True
-                                                break
-
-                                        except Exception as e:
-                                            share_error_msg = e
-                                            error += 1
-
-                                    if not share_success:
-                                        print('分享失败：', share_error_msg)
-                                        save_config('./share/share_error.txt',
-                                                    content=f'{error}.{first_dir}/{second_dir} 文件夹\n', mode='a')
-                                        save_config('./share/retry.txt',
-                                                    content=f'{n} | {first_dir} | {second_dir} | {fid}\n', mode='a')
-                            second_total = json_data2['metadata']['_total']
-                            second_size = json_data2['metadata']['_size']
-                            second_page = json_data2['metadata']['_page']
-                            if second_size * second_page >= second_total:
-                                break
-                            second_page += 1
-
-                second_total = json_data['metadata']['_total']
-                second_size = json_data['metadata']['_size']
-                second_page = json_data['metadata']['_page']
-                if second_size * second_page >= second_total:
-                    break
-                first_page += 1
+                    return 1, 1
+
+            async def list_share_dir(fid: str) -> list[dict[str, Any]]:
+                return await self.list_dir(fid, sort='file_type:asc,file_name:asc')
+
+            async def share_jobs() -> AsyncIterator[tuple[str, str]]:
+                # 根目录在遍历中为第1层，其下第N级目录在第N层的文件夹列表中出现
+                async for folder in walk_tree(list_share_dir, [(pwd_id, '')], workers=self.list_concurrency,
+                                              max_depth=None if leaf_only else traverse_depth, ordered=True):
+                    if folder.error:
+                        custom_print(f'获取 {folder.path or "根目录"} 文件夹列表失败：{folder.error!r}', error_msg=True)
+                        save_config('./share/share_error.txt', content=f'{folder.path or "根目录"} 文件夹\n', mode='a')
+                        continue
+                    sub_dirs = [i for i in folder.entries if i['dir']]
+                    if leaf_only:
+                        if folder.depth > 1 and not sub_dirs:
+                            yield folder.fid, folder.path
+                    elif folder.depth == traverse_depth:
+                        for i in sub_dirs:
+                            yield i['fid'], join_path(folder.path, i['file_name'])
+
+            n, error = await self.share_folders(share_jobs(), save_share_path, url_type=url_type,
+                                                expired_type=expired_type, password=password)
             custom_print(f"总共分享了 {n} 个文件夹，已经保存至 {save_share_path}")
+            self.metadata_cache.invalidate(self.account_key)
+            return n, error
 
         except Exception as e:
             print('分享失败：', e)
             with open('./share/share_error.txt', 'a', encoding='utf-8') as f:
-                f.write(f'{first_dir}/{second_dir} 文件夹')
+                f.write(f'{share_url} 文件夹\n')
+            return 0, 0
 
     async def share_run_retry(self, retry_url: str, url_type: int = 1, expired_type: int = 2, password: str = ''):
 
-        data_list = retry_url.split('\n')
-        n = 0
-        error = 0
+        async def share_jobs() -> AsyncIterator[tuple[str, str]]:
+            for line in retry_url.split('\n'):
+                data = line.split(' | ')
+                if len(data) >= 3:
+                    yield data[-1].strip(), '/'.join(data[1:-1])
+
         save_share_path = 'share/retry_share_url.txt'
-        error_data = []
-        for i1 in data_list:
-            data = i1.split(' | ')
-            if data and len(data) == 4:
-                first_dir = data[-3]
-                second_dir = data[-2]
-                fid = data[-1]
-                share_error_msg = ''
-                for i in range(3):
-                    try:
-                        task_id = await self.get_share_task_id(fid, second_dir, url_type=url_type,
-                                                               expired_type=expired_type,
-                                                               password=password)
-                        share_id = await self.get_share_id(task_id)
-                        share_url, title = await self.submit_share(share_id)
-                        with open(save_share_path, 'a', encoding='utf-8') as f:
-                            content = f'{n} | {first_dir} | {second_dir} | {share_url}'
-                            f.write(content + '\n')
-                            custom_print(f'{n}.分享成功 {first_dir}/{second_dir} 文件夹')
-                            share_success = True
-                            break
-                    except Exception as e:
-                        share_error_msg = e
-                        error += 1
-
-                if not share_success:
-                    print('分享失败：', share_error_msg)
-                    error_data.append(i1)
-        error_content = '\n'.join(error_data)
-        save_config(path='./share/retry.txt', content=error_content, mode='w')
+        # 仍然失败的文件夹先写入临时文件，全部处理完才替换 retry.txt，中途退出时原有记录不会丢失
+        retry_path = './share/retry.txt.tmp'
+        save_config(path=retry_path, content='', mode='w')
+        await self.share_folders(share_jobs(), save_share_path, url_type=url_type, expired_type=expired_type,
+                                 password=password, retry_path=retry_path)
+        os.replace(retry_path, './share/retry.txt')
+        self.metadata_cache.invalidate(self.account_key)
 
 
 def load_url_file(fpath: str) -> list[str]:
@@ -759,6 +1251,18 @@ def load_url_file(fpath: str) -> list[str]:
     return url_pattern.findall(content)
 
 
+def print_journal(journal: TransferJournal) -> None:
+    summary = journal.summary()
+    custom_print(f'转存记录共{sum(summary.values())}条：' + '，'.join(f'{state} {count}' for state, count in summary.items()))
+    jobs = journal.jobs(states=(PENDING, STOKEN_OK, SAVING, FAILED))
+    if jobs:
+        table = PrettyTable(['分享链接', '状态', '任务ID', '错误码', '错误信息', '尝试次数', '更新时间'])
+        for job in jobs:
+            table.add_row([job['url'], job['state'], job['task_id'] or '', job['code'] or '', job['message'] or '',
+                           job['attempts'], get_datetime(job['updated_at'])])
+        print(table)
+
+
 def print_ascii():
     print(r"""
 ║                                     _                                  _                     _       ║    
@@ -781,15 +1285,30 @@ def print_menu() -> None:
 
 
 if __name__ == '__main__':
-    quark_file_manager = QuarkPanFileManager(headless=False, slow_mo=500)
+    if sys.argv[1:2] == ['journal']:  # python quark.py journal [--clear]：查看或清空批量转存记录，不登录也不发请求
+        transfer_journal = TransferJournal()
+        if '--clear' in sys.argv:
+            transfer_journal.clear()
+            custom_print('批量转存记录已清空')
+        else:
+            print_journal(transfer_journal)
+        transfer_journal.close()
+        sys.exit(0)
+
+    quark_file_manager = QuarkPanFileManager(headless=False, slow_mo=500, metrics_path=os.environ.get('QUARK_METRICS'),
+                                             progress=os.environ.get('QUARK_PROGRESS', 'auto'),
+                                             skip_existing=os.environ.get('QUARK_SKIP_EXISTING') == '1')
+    runner = asyncio.Runner()  # one event loop for the whole session so the pooled client is reused
     while True:
         print_menu()
 
-        to_dir_id, to_dir_name = asyncio.run(quark_file_manager.load_folder_id())
+        to_dir_id, to_dir_name = runner.run(quark_file_manager.load_folder_id())
 
         input_text = input("请输入你的选择(1—6或q退出)：")
 
         if input_text and input_text.strip() in ['q', 'Q']:
+            runner.run(quark_file_manager.close())
+            runner.close()
             print("已退出程序！")
             sys.exit(0)
 
@@ -806,16 +1325,17 @@ if __name__ == '__main__':
                         custom_print(f"\r检测到url.txt文件中有{len(urls)}条分享链接")
                         ok = input("请你确认是否开始批量保存(确认请按2):")
                         if ok and ok.strip() == '2':
-                            for index, url in enumerate(urls):
-                                print(f"正在转存第{index + 1}个")
-                                asyncio.run(quark_file_manager.run(url.strip(), to_dir_id))
+                            runner.run(quark_file_manager.batch_run([url.strip() for url in urls], to_dir_id))
                     except FileNotFoundError:
                         with open('url.txt', 'w', encoding='utf-8'):
                             sys.exit(-1)
                 else:
                     url = input("请输入夸克文件分享地址：")
                     if url and len(url.strip()) > 20:
-                        asyncio.run(quark_file_manager.run(url.strip(), to_dir_id))
+                        try:
+                            runner.run(quark_file_manager.run(url.strip(), to_dir_id))
+                        except QuarkApiError:
+                            pass  # 错误信息已在 get_share_save_task_id 或 submit_task 中输出
 
             elif input_text.strip() == '2':
                 share_option = input("请输入你的选择(1分享 2重试分享)：")
@@ -845,28 +1365,32 @@ if __name__ == '__main__':
                 print("\n\r请选择遍历深度：")
                 print("0.不遍历（只分享根目录-默认）")
                 print("1.遍历只分享一级目录")
-                print("2.遍历只分享两级目录\n")
-                traverse_option = input("请输入选项(0/1/2)：")
+                print("2.遍历只分享两级目录")
+                print("N.遍历只分享第N级目录（输入任意层数）")
+                print("L.遍历只分享最末级目录（没有子文件夹的目录）\n")
+                traverse_option = input("请输入选项(0/1/2/N/L)：").strip()
                 _traverse_depth = 0  # 默认只分享根目录
-                if traverse_option in ['1', '2']:
+                _leaf_only = traverse_option in ['l', 'L']
+                if traverse_option.isdigit():
                     _traverse_depth = int(traverse_option)
 
                 if share_option and share_option == '1':
-                    asyncio.run(quark_file_manager.share_run(
+                    runner.run(quark_file_manager.share_run(
                         url.strip(), folder_id=to_dir_id, url_type=int(url_encrypt),
-                        expired_type=int(_expired_type), password=passcode, traverse_depth=_traverse_depth))
+                        expired_type=int(_expired_type), password=passcode, traverse_depth=_traverse_depth,
+                        leaf_only=_leaf_only))
                 else:
-                    asyncio.run(quark_file_manager.share_run_retry(url.strip(), url_type=url_encrypt,
-                                                                   expired_type=_expired_type, password=passcode))
+                    runner.run(quark_file_manager.share_run_retry(url.strip(), url_type=url_encrypt,
+                                                                  expired_type=_expired_type, password=passcode))
 
             elif input_text.strip() == '3':
-                to_dir_id, to_dir_name = asyncio.run(quark_file_manager.load_folder_id(renew=True))
+                to_dir_id, to_dir_name = runner.run(quark_file_manager.load_folder_id(renew=True))
                 custom_print(f"已切换保存目录至网盘 {to_dir_name} 文件夹\n")
 
             elif input_text.strip() == '4':
                 create_name = input("请输入需要创建的文件夹名称：")
                 if create_name:
-                    asyncio.run(quark_file_manager.create_dir(create_name.strip()))
+                    runner.run(quark_file_manager.create_dir(create_name.strip()))
                 else:
                     custom_print("创建的文件夹名称不可为空！", error_msg=True)
 
@@ -876,7 +1400,7 @@ if __name__ == '__main__':
                     if is_batch:
                         if is_batch.strip() == '1':
                             url = input("请输入夸克文件分享地址：")
-                            asyncio.run(quark_file_manager.run(url.strip(), to_dir_id, download=True))
+                            runner.run(quark_file_manager.run(url.strip(), to_dir_id, download=True))
                         elif is_batch.strip() == '2':
                             urls = load_url_file('./url.txt')
                             if not urls:
@@ -884,7 +1408,7 @@ if __name__ == '__main__':
                                 continue
 
                             for index, url in enumerate(urls):
-                                asyncio.run(quark_file_manager.run(url.strip(), to_dir_id, download=True))
+                                runner.run(quark_file_manager.run(url.strip(), to_dir_id, download=True))
 
                 except FileNotFoundError:
                     with open('url.txt', 'w', encoding='utf-8'):
@@ -892,7 +1416,11 @@ if __name__ == '__main__':
 
             elif input_text.strip() == '6':
                 save_config(f'{CONFIG_DIR}/cookies.txt', '')
-                quark_file_manager = QuarkPanFileManager(headless=False, slow_mo=500)
+                runner.run(quark_file_manager.close())  # 释放旧账号的连接池和数据库连接
+                quark_file_manager = QuarkPanFileManager(headless=False, slow_mo=500,
+                                                         metrics_path=os.environ.get('QUARK_METRICS'),
+                                                         progress=os.environ.get('QUARK_PROGRESS', 'auto'),
+                                                         skip_existing=os.environ.get('QUARK_SKIP_EXISTING') == '1')
                 quark_file_manager.get_cookies()
 
         else:
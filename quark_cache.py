@@ -0,0 +1,88 @@
+import json
+import sqlite3
+import time
+from typing import Any, Union
+
+from quark_login import CONFIG_DIR
+from utils import open_db
+
+
+class MetadataCache:
+    """
+    On-disk cache of listing responses, stored in SQLite under ``CONFIG_DIR``.
+
+    Entries are keyed by account, scope (``drive:<pdir_fid>`` or ``share:<pwd_id>:<pdir_fid>``) and the page
+    parameters. Every entry expires after its TTL, and the least recently used entries are evicted once there are
+    more than ``max_entries``. Writes to the drive must call ``invalidate`` for the folders they change.
+    """
+
+    def __init__(self, path: str = f'{CONFIG_DIR}/metadata_cache.db', ttl: float = 600.0, max_entries: int = 20000,
+                 enabled: bool = True) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._db: Union[sqlite3.Connection, None] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = open_db(self.path)
+            self._db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, account TEXT, scope TEXT, '
+                             'value TEXT, expires_at REAL, used_at REAL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS entries_scope ON entries (account, scope)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used_at)')
+        return self._db
+
+    @staticmethod
+    def make_key(account: str, scope: str, params: dict[str, Any]) -> str:
+        return json.dumps([account, scope, sorted(params.items())], ensure_ascii=False)
+
+    def get(self, account: str, scope: str, params: dict[str, Any]) -> Union[dict[str, Any], None]:
+        if not self.enabled:
+            return None
+        key = self.make_key(account, scope, params)
+        row = self.db.execute('SELECT value, expires_at FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] < now:
+            self.db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            return None
+        self.db.execute('UPDATE entries SET used_at = ? WHERE key = ?', (now, key))
+        return json.loads(row[0])
+
+    def set(self, account: str, scope: str, params: dict[str, Any], value: dict[str, Any],
+            ttl: Union[float, None] = None) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        self.db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                        (self.make_key(account, scope, params), account, scope,
+                         json.dumps(value, ensure_ascii=False), now + (self.ttl if ttl is None else ttl), now))
+        self.evict()
+
+    def evict(self) -> None:
+        excess = self.db.execute('SELECT COUNT(*) FROM entries').fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.db.execute('DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used_at LIMIT ?)',
+                            (excess,))
+
+    def invalidate(self, account: str, scope: Union[str, None] = None) -> None:
+        """Drop one scope of an account, or everything cached for the account when ``scope`` is None."""
+        if not self.enabled:
+            return
+        if scope is None:
+            self.db.execute('DELETE FROM entries WHERE account = ?', (account,))
+        else:
+            self.db.execute('DELETE FROM entries WHERE account = ? AND scope = ?', (account, scope))
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        self.db.execute('DELETE FROM entries')
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
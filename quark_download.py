@@ -0,0 +1,606 @@
+import asyncio
+import base64
+import binascii
+import contextlib
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, AsyncContextManager, Awaitable, BinaryIO, Callable, Union
+
+import httpx
+
+from quark_progress import ProgressReporter, Transfer
+from utils import custom_print
+
+StreamFactory = Callable[..., AsyncContextManager[httpx.Response]]
+
+
+class DownloadState:
+    """
+    Sidecar of a ``.part`` file: the expected size and the byte ranges already on disk.
+
+    Ranges are half-open ``[start, end)`` and kept merged. ``add`` only records bytes that were flushed to the
+    part file, and ``save`` is rate limited, so after a crash the sidecar may under-report but never over-report.
+    """
+
+    def __init__(self, path: str, size: int, done: Union[list[list[int]], None] = None,
+                 save_interval: float = 1.0) -> None:
+        self.path = path
+        self.size = size
+        self.done: list[list[int]] = []
+        self.save_interval = save_interval
+        self._saved_at = 0.0
+        for start, end in done or []:
+            self.add(start, end)
+
+    @classmethod
+    def load(cls, path: str) -> Union['DownloadState', None]:
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            return cls(path, int(data['size']), data['ranges'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def add(self, start: int, end: int) -> None:
+        merged = []
+        for s, e in self.done:
+            if e < start or s > end:
+                merged.append([s, e])
+            else:
+                start, end = min(s, start), max(e, end)
+        merged.append([start, end])
+        self.done = sorted(merged)
+
+    @property
+    def completed(self) -> int:
+        return sum(e - s for s, e in self.done)
+
+    def missing(self) -> list[tuple[int, int]]:
+        gaps, position = [], 0
+        for start, end in self.done:
+            if start > position:
+                gaps.append((position, start))
+            position = max(position, end)
+        if position < self.size:
+            gaps.append((position, self.size))
+        return gaps
+
+    def save(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._saved_at < self.save_interval:
+            return
+        self._saved_at = now
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'size': self.size, 'ranges': self.done}, f)
+        os.replace(tmp_path, self.path)
+
+
+class ChecksumMismatch(ValueError):
+    """A finished download does not match the size or checksum the API reported for it."""
+
+
+def normalize_digest(value: Any, algorithm: str) -> Union[str, None]:
+    """Hex form of a digest given as hex or base64, None when it is neither."""
+    if not isinstance(value, str) or not value:
+        return None
+    size = hashlib.new(algorithm).digest_size
+    if len(value) == size * 2 and re.fullmatch(r'[0-9a-fA-F]+', value):
+        return value.lower()
+    try:
+        raw = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return raw.hex() if len(raw) == size else None
+
+
+class RangeHasher:
+    """
+    Hashes a file from front to back while its ranges are written in any order, from any thread.
+
+    ``written(start, chunks)`` records a range that is on disk. Data that continues the hash is taken from
+    ``chunks`` when they are at hand and read back from ``path`` otherwise (ranges written out of order, or on disk
+    from an earlier, interrupted run). One thread hashes at a time; the others only record their range.
+    """
+
+    def __init__(self, path: str, algorithm: str = 'md5', done: Union[list[list[int]], None] = None,
+                 read_size: int = 4 * 1024 * 1024) -> None:
+        self.path = path
+        self.algorithm = algorithm
+        self.hash = hashlib.new(algorithm)
+        self.position = 0
+        self.read_size = read_size
+        self._ranges: dict[int, int] = {}
+        self._ends: dict[int, int] = {}
+        self._ranges_lock = threading.Lock()
+        self._hash_lock = threading.Lock()
+        for start, end in done or []:
+            self._record(start, end)
+
+    def _record(self, start: int, end: int) -> None:
+        """Remember ``[start, end)``, merged with the recorded ranges it touches."""
+        if start >= end:
+            return
+        with self._ranges_lock:
+            if start in self._ends:
+                start = self._ends.pop(start)
+            if end in self._ranges:
+                end = self._ranges.pop(end)
+                del self._ends[end]
+            self._ranges[start] = end
+            self._ends[end] = start
+
+    def _take(self) -> Union[int, None]:
+        """Pop the recorded range that starts at ``position`` and return its end."""
+        with self._ranges_lock:
+            end = self._ranges.pop(self.position, None)
+            if end is not None:
+                del self._ends[end]
+            return end
+
+    def _read(self, start: int, end: int) -> None:
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            while start < end:
+                data = f.read(min(self.read_size, end - start))
+                if not data:
+                    raise ChecksumMismatch(f'{self.path} 在 {start} 处提前结束')
+                self.hash.update(data)
+                start += len(data)
+
+    def _advance(self, start: int = -1, chunks: Union[list[bytes], None] = None) -> None:
+        while self._hash_lock.acquire(blocking=False):
+            try:
+                while (end := self._take()) is not None:
+                    if start == self.position and chunks:
+                        for chunk in chunks:
+                            self.hash.update(chunk)
+                        self.position += sum(len(chunk) for chunk in chunks)
+                    if end > self.position:
+                        self._read(self.position, end)
+                        self.position = end
+            finally:
+                self._hash_lock.release()
+            with self._ranges_lock:  # 释放锁之前别的线程可能刚记录了接续的范围
+                if self.position not in self._ranges:
+                    return
+
+    def written(self, start: int, chunks: list[bytes]) -> None:
+        self._record(start, start + sum(len(chunk) for chunk in chunks))
+        self._advance(start, chunks)
+
+    def hexdigest(self, size: int) -> str:
+        """Hash whatever is still missing up to ``size`` and return the digest."""
+        self._advance()
+        if self.position < size:
+            self._read(self.position, size)
+            self.position = size
+        return self.hash.hexdigest()
+
+
+class BufferedWriter:
+    """
+    Writes a sequential run of bytes into an open file starting at ``position``, off the event loop.
+
+    Chunks are collected until ``buffer_size`` bytes are waiting and then written together from a worker thread
+    while the next block fills, with at most one write in flight, so a slow disk only pauses the producer once two
+    blocks are waiting. Written blocks are passed to ``hasher`` from the same thread, and ``on_flush(start, end)``
+    is called after a block has been written and flushed.
+    """
+
+    def __init__(self, f: BinaryIO, position: int, buffer_size: int = 4 * 1024 * 1024,
+                 on_flush: Union[Callable[[int, int], Any], None] = None,
+                 hasher: Union[RangeHasher, None] = None) -> None:
+        self.f = f
+        self.position = position
+        self.buffer_size = max(1, buffer_size)
+        self.on_flush = on_flush
+        self.hasher = hasher
+        self._chunks: list[bytes] = []
+        self._buffered = 0
+        self._pending: Union[asyncio.Future, None] = None
+
+    def _write_at(self, position: int, chunks: list[bytes]) -> None:
+        self.f.seek(position)
+        self.f.writelines(chunks)
+        self.f.flush()
+        if self.hasher:
+            self.hasher.written(position, chunks)
+
+    async def _wait_pending(self) -> None:
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            start, end = await pending
+            if self.on_flush:
+                self.on_flush(start, end)
+
+    async def _submit(self) -> None:
+        await self._wait_pending()
+        chunks, start, end = self._chunks, self.position, self.position + self._buffered
+        self._chunks, self._buffered, self.position = [], 0, end
+
+        async def write() -> tuple[int, int]:
+            await asyncio.to_thread(self._write_at, start, chunks)
+            return start, end
+        self._pending = asyncio.ensure_future(write())
+
+    async def write(self, chunk: bytes) -> None:
+        self._chunks.append(chunk)
+        self._buffered += len(chunk)
+        if self._buffered >= self.buffer_size:
+            await self._submit()
+
+    async def close(self) -> None:
+        """Write out what is buffered and wait for every write; on cancellation the in-flight write still ends."""
+        if self._chunks:
+            await self._submit()
+        if self._pending is not None:
+            await asyncio.shield(self._pending)
+            await self._wait_pending()
+
+
+class QuarkDownloader:
+    """
+    Downloads a file over one or more HTTP connections into ``<name>.part`` and renames it into place when done.
+
+    The first request asks for ``bytes=<first missing byte>-``. On 206 the missing ranges are split into at most
+    ``segments`` pieces that are fetched concurrently into the part file, the first response feeding the first
+    piece. Completed ranges are recorded in ``<name>.part.json`` so an interrupted download continues where it
+    stopped. Servers that ignore Range (200) are read as a single, non-resumable stream. The body is read in
+    ``chunk_size`` chunks and written through a BufferedWriter in ``write_buffer_size`` blocks; with ``preallocate``
+    the part file gets its full size before the first write. Progress goes to ``progress`` and ``on_bytes`` is
+    called with the size of every chunk received.
+
+    A finished file is checked against the size in ``expected`` before it is renamed into place; a mismatch deletes
+    the part file and raises ChecksumMismatch. With ``verify`` the file is also hashed while it is written, with the
+    MD5 or SHA1 (hex or base64) in ``expected`` checked the same way, or MD5 when it has no checksum, and the digest
+    is returned. Without ``verify`` nothing is hashed.
+    """
+
+    def __init__(self, stream: StreamFactory, segments: int = 4, min_segment_size: int = 16 * 1024 * 1024,
+                 chunk_size: int = 256 * 1024, write_buffer_size: int = 4 * 1024 * 1024, preallocate: bool = True,
+                 on_bytes: Union[Callable[[int], Any], None] = None,
+                 progress: Union[ProgressReporter, None] = None, verify: bool = True) -> None:
+        self.stream = stream
+        self.on_bytes = on_bytes
+        self.progress = progress or ProgressReporter(mode='off')
+        self.segments = max(1, segments)
+        self.min_segment_size = max(1, min_segment_size)
+        self.chunk_size = max(1, chunk_size)
+        self.write_buffer_size = max(self.chunk_size, write_buffer_size)
+        self.preallocate = preallocate
+        self.verify = verify
+
+    @staticmethod
+    def allocate(path: str, size: int) -> None:
+        """Give ``path`` its final size, reserving the blocks where the platform supports it."""
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            if hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, size)
+                    return
+                except OSError:
+                    pass  # 文件系统不支持时退回稀疏文件
+            f.truncate(size)
+
+    @staticmethod
+    def parse_total_size(response: httpx.Response) -> Union[int, None]:
+        if response.status_code == 206:
+            match = re.search(r'/(\d+)$', response.headers.get('content-range', ''))
+            return int(match.group(1)) if match else None
+        content_length = response.headers.get('content-length')
+        return int(content_length) if content_length else None
+
+    def split_ranges(self, gaps: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        missing = sum(end - start for start, end in gaps)
+        piece_size = max(self.min_segment_size, -(-missing // self.segments))
+        return [(start, min(start + piece_size, end)) for gap_start, end in gaps
+                for start in range(gap_start, end, piece_size)]
+
+    def new_hasher(self, part_path: str, expected: Union[dict[str, Any], None],
+                   state: Union[DownloadState, None] = None) -> Union[RangeHasher, None]:
+        if not self.verify:
+            return None
+        for algorithm in ('md5', 'sha1'):
+            if normalize_digest((expected or {}).get(algorithm), algorithm):
+                break
+        else:
+            algorithm = 'md5'
+        return RangeHasher(part_path, algorithm, state.done if state else None)
+
+    async def _finish(self, part_path: str, save_path: str, size: int, hasher: Union[RangeHasher, None],
+                      expected: Union[dict[str, Any], None]) -> dict[str, Any]:
+        """Verify the complete part file and move it into place; returns its size and digest."""
+        expected = expected or {}
+        result: dict[str, Any] = {'size': size}
+        error = None
+        if expected.get('size') is not None and int(expected['size']) != size:
+            error = f'大小 {size} 与远程记录的 {expected["size"]} 不一致'
+        elif hasher:
+            result[hasher.algorithm] = await asyncio.to_thread(hasher.hexdigest, size)
+            remote = normalize_digest(expected.get(hasher.algorithm), hasher.algorithm)
+            if remote and remote != result[hasher.algorithm]:
+                error = f'{hasher.algorithm} {result[hasher.algorithm]} 与远程记录的 {remote} 不一致'
+        for path in [part_path + '.json'] + ([part_path] if error else []):
+            if os.path.exists(path):
+                os.remove(path)
+        if error:
+            raise ChecksumMismatch(f'{os.path.basename(save_path)} 校验失败：{error}')
+        os.replace(part_path, save_path)
+        return result
+
+    async def download(self, download_url: str, save_path: str, headers: dict,
+                       expected: Union[dict[str, Any], None] = None) -> dict[str, Any]:
+        part_path, state_path = save_path + '.part', save_path + '.part.json'
+        state = DownloadState.load(state_path) if os.path.exists(part_path) else None
+        gaps = state.missing() if state else []
+        if state and not gaps:  # 上次已下载完成但未来得及重命名
+            return await self._finish(part_path, save_path, state.size, self.new_hasher(part_path, expected, state),
+                                      expected)
+        first = gaps[0][0] if gaps else 0
+
+        async with contextlib.AsyncExitStack() as stack:
+            response = await stack.enter_async_context(
+                self.stream('GET', download_url, headers={**headers, 'range': f'bytes={first}-'}))
+            if response.status_code == 416 and not state:  # 空文件不存在可满足的 Range
+                open(part_path, 'wb').close()
+                return await self._finish(part_path, save_path, 0, self.new_hasher(part_path, expected), expected)
+            response.raise_for_status()
+            total = self.parse_total_size(response)
+            if response.status_code != 206 or not total:
+                return await self._download_stream(response, part_path, save_path, total, expected)
+            state = state or DownloadState(state_path, total)
+            if state.size == total:
+                return await self._download_ranges(response, stack.aclose, download_url, headers, part_path,
+                                                   save_path, state, expected)
+
+        # 远程文件大小与断点记录不一致，丢弃已下载部分重新下载
+        for path in (part_path, state_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return await self.download(download_url, save_path, headers, expected)
+
+    async def _download_stream(self, response: httpx.Response, part_path: str, save_path: str,
+                               total: Union[int, None], expected: Union[dict[str, Any], None]) -> dict[str, Any]:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        if total and self.preallocate:
+            await asyncio.to_thread(self.allocate, part_path, total)
+        written = 0
+        hasher = self.new_hasher(part_path, expected)
+        transfer = self.progress.begin(os.path.basename(save_path), total)
+        with open(part_path, 'r+b' if os.path.exists(part_path) else 'wb') as f:
+            writer = BufferedWriter(f, 0, self.write_buffer_size, hasher=hasher)
+            try:
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    await writer.write(chunk)
+                    written += len(chunk)
+                    transfer.update(len(chunk))
+                    if self.on_bytes:
+                        self.on_bytes(len(chunk))
+            finally:
+                self.progress.end(transfer)
+                await writer.close()
+            if written != total:
+                f.truncate(written)
+        return await self._finish(part_path, save_path, written, hasher, expected)
+
+    async def _download_ranges(self, response: httpx.Response, release: Callable[[], Awaitable[Any]],
+                               download_url: str, headers: dict, part_path: str, save_path: str,
+                               state: DownloadState, expected: Union[dict[str, Any], None]) -> dict[str, Any]:
+        """
+        Fetch the missing ranges of ``state``: the first from ``response``, the others concurrently. ``release``
+        closes the first response once its range is written, so that its connection (and the host slot of the
+        stream factory) is free for the other ranges instead of being held while they are awaited.
+        """
+        pieces = self.split_ranges(state.missing())
+        if self.preallocate:
+            await asyncio.to_thread(self.allocate, part_path, state.size)
+        elif not os.path.exists(part_path):
+            open(part_path, 'wb').close()
+        state.save(force=True)
+
+        hasher = self.new_hasher(part_path, expected, state)
+        transfer = self.progress.begin(os.path.basename(save_path), state.size, state.completed)
+        semaphore = asyncio.Semaphore(max(1, self.segments - 1))  # 第一段复用首个响应
+        tasks = [asyncio.create_task(self._fetch_range(download_url, headers, part_path, start, end, state, transfer,
+                                                       hasher, semaphore))
+                 for start, end in pieces[1:]]
+        try:
+            await self._write_range(response, part_path, *pieces[0], state, transfer, hasher)
+            await release()
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            state.save(force=True)
+            raise
+        finally:
+            self.progress.end(transfer)
+        return await self._finish(part_path, save_path, state.size, hasher, expected)
+
+    async def _write_range(self, response: httpx.Response, part_path: str, start: int, end: int,
+                           state: DownloadState, transfer: Transfer, hasher: Union[RangeHasher, None]) -> None:
+        """Write ``response`` into ``[start, end)`` of the part file, stopping at ``end`` even if the body goes on."""
+        def flushed(flush_start: int, flush_end: int) -> None:
+            state.add(flush_start, flush_end)
+            state.save()
+
+        position = start
+        with open(part_path, 'r+b') as f:
+            writer = BufferedWriter(f, start, self.write_buffer_size, on_flush=flushed, hasher=hasher)
+            try:
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    chunk = chunk[:end - position]
+                    await writer.write(chunk)
+                    position += len(chunk)
+                    transfer.update(len(chunk))
+                    if self.on_bytes:
+                        self.on_bytes(len(chunk))
+                    if position >= end:
+                        break
+            finally:
+                await writer.close()
+        if position < end:
+            raise httpx.ReadError(f'分段下载不完整：{start}-{end} 缺少 {end - position} 字节')
+
+    async def _fetch_range(self, download_url: str, headers: dict, part_path: str, start: int, end: int,
+                           state: DownloadState, transfer: Transfer, hasher: Union[RangeHasher, None],
+                           semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            range_headers = {**headers, 'range': f'bytes={start}-{end - 1}'}
+            async with self.stream('GET', download_url, headers=range_headers) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise httpx.ReadError(f'服务器未按 Range 返回分段：{start}-{end}')
+                await self._write_range(response, part_path, start, end, state, transfer, hasher)
+
+
+class DownloadUrlPipeline:
+    """
+    Resolves download URLs for submitted fids in chunks, ahead of the transfer workers.
+
+    Fids wait in an unbounded queue; resolved entries wait in a queue bounded by ``lookahead``, so resolution runs
+    only that far ahead of the transfers and URLs do not sit long enough to expire. Every entry carries the
+    monotonic time it was issued at; ``is_stale`` entries, and entries whose transfer got 403/410, are re-resolved
+    with ``refresh``.
+    """
+
+    def __init__(self, resolve: Callable[[list[str]], Awaitable[list[dict[str, Any]]]], chunk_size: int = 50,
+                 lookahead: int = 100, max_age: float = 1800.0) -> None:
+        self.resolve = resolve
+        self.chunk_size = max(1, chunk_size)
+        self.max_age = max_age
+        self.pending: asyncio.Queue = asyncio.Queue()
+        self.ready: asyncio.Queue = asyncio.Queue(maxsize=max(1, lookahead))
+        self.folders: dict[str, str] = {}
+        self.failed: list[str] = []
+        self.resolved = 0
+
+    def submit(self, fid: str, folder: str = '') -> None:
+        self.folders[fid] = folder
+        self.pending.put_nowait(fid)
+
+    def close(self) -> None:
+        """No more submissions; workers get None once everything submitted has been handed out."""
+        self.pending.put_nowait(None)
+
+    def is_stale(self, entry: dict[str, Any]) -> bool:
+        return time.monotonic() - entry['issued_at'] > self.max_age
+
+    async def _resolve(self, fids: list[str]) -> list[dict[str, Any]]:
+        entries = await self.resolve(fids)
+        issued_at = time.monotonic()
+        for entry in entries:
+            entry['issued_at'] = issued_at
+            entry['folder'] = self.folders.get(entry['fid'], '')
+        return entries
+
+    async def refresh(self, entry: dict[str, Any]) -> dict[str, Any]:
+        entries = await self._resolve([entry['fid']])
+        if not entries:
+            raise httpx.HTTPError(f'重新获取下载地址失败：{entry["file_name"]}')
+        return {**entry, **entries[0]}
+
+    async def run(self) -> None:
+        closed = False
+        while not closed:
+            fids = [await self.pending.get()]
+            while len(fids) < self.chunk_size and not self.pending.empty():
+                fids.append(self.pending.get_nowait())
+            if None in fids:
+                closed = True
+                fids = [fid for fid in fids if fid is not None]
+            if not fids:
+                continue
+            try:
+                entries = await self._resolve(fids)
+            except Exception as e:
+                custom_print(f'文件下载地址列表获取失败，{e}', error_msg=True)
+                entries = []
+            returned = {entry['fid'] for entry in entries}
+            self.failed.extend(fid for fid in fids if fid not in returned)
+            for entry in entries:
+                self.resolved += 1
+                entry['index'] = self.resolved
+                await self.ready.put(entry)
+        await self.ready.put(None)
+
+    async def get(self) -> Union[dict[str, Any], None]:
+        entry = await self.ready.get()
+        if entry is None:
+            self.ready.put_nowait(None)  # 让其他传输协程也能收到结束信号
+        return entry
+
+
+class DownloadManifest:
+    """
+    Record of every file downloaded under ``root``: fid, relative path, remote size and updated_at, local mtime.
+
+    A listed file is current when the record matches its remote size and updated_at and the local file still has
+    the recorded size and mtime, so re-syncing an unchanged tree needs neither download URLs nor byte transfers.
+    Records also keep the digest the file was verified with, and a listed checksum that differs from it makes the
+    file stale.
+    """
+
+    def __init__(self, root: str, name: str = '.quark_manifest.json', save_interval: float = 30.0) -> None:
+        self.root = root
+        self.path = os.path.join(root, name)
+        self.save_interval = save_interval
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.pending: dict[str, dict[str, Any]] = {}
+        self._saved_at = time.monotonic()
+        self._dirty = False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def relative(self, save_path: str) -> str:
+        return os.path.relpath(save_path, self.root).replace(os.sep, '/')
+
+    def is_current(self, item: dict[str, Any], save_path: str) -> bool:
+        record = self.entries.get(item['fid'])
+        if (not record or record['path'] != self.relative(save_path) or record['size'] != item.get('size')
+                or record['updated_at'] != item.get('updated_at')):
+            return False
+        for algorithm in ('md5', 'sha1'):
+            remote = normalize_digest(item.get(algorithm), algorithm)
+            if remote and record.get(algorithm) and remote != record[algorithm]:
+                return False
+        try:
+            stat = os.stat(save_path)
+        except OSError:
+            return False
+        return stat.st_size == record['size'] and stat.st_mtime_ns == record['mtime_ns']
+
+    def expect(self, item: dict[str, Any], save_path: str) -> None:
+        """Remember the listing metadata of a file that is about to be downloaded."""
+        self.pending[item['fid']] = {'path': self.relative(save_path), 'size': item.get('size'),
+                                     'updated_at': item.get('updated_at')}
+
+    def record(self, fid: str, save_path: str, checksums: Union[dict[str, Any], None] = None) -> None:
+        stat = os.stat(save_path)
+        record = self.pending.pop(fid, None) or {'size': stat.st_size, 'updated_at': None}
+        record.update(path=self.relative(save_path), mtime_ns=stat.st_mtime_ns)
+        record.update((key, value) for key, value in (checksums or {}).items() if key in ('md5', 'sha1'))
+        self.entries[fid] = record
+        self._dirty = True
+        self.save()
+
+    def save(self, force: bool = False) -> None:
+        if not self._dirty or (not force and time.monotonic() - self._saved_at < self.save_interval):
+            return
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        self._saved_at = time.monotonic()
+        self._dirty = False
@@ -0,0 +1,211 @@
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Union
+
+from quark_login import CONFIG_DIR
+from quark_walker import walk_tree
+from utils import open_db
+
+COLUMNS = 'fid, parent, name, is_dir, size, updated_at'
+
+
+class DriveIndex:
+    """
+    Local index of every file and folder of a drive, kept in ``drive_index.db`` so it survives restarts.
+
+    Each entry keeps its fid, parent fid, name, type, size (item count for folders) and ``updated_at``, so that
+    entries are found by name prefix or substring and by path without listing the drive. Substring search uses an
+    FTS5 trigram index where SQLite has one and scans the names otherwise. ``refresh`` walks the drive with
+    bounded concurrency but lists a folder again only when its ``updated_at`` differs from the one it had when it
+    was last listed; every ``full_interval`` seconds the whole drive is walked, which also picks up changes deep
+    in folders whose parents kept their ``updated_at``.
+    """
+
+    def __init__(self, path: str = f'{CONFIG_DIR}/drive_index.db', full_interval: float = 86400.0,
+                 enabled: bool = True) -> None:
+        self.path = path
+        self.full_interval = full_interval
+        self.enabled = enabled
+        self.trigram = False
+        self._db: Union[sqlite3.Connection, None] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = open_db(self.path)
+            self._db.execute('CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, account TEXT, fid TEXT, '
+                             'parent TEXT, name TEXT, is_dir INTEGER, size INTEGER, updated_at INTEGER, '
+                             'listed INTEGER, UNIQUE (account, fid))')
+            self._db.execute('CREATE INDEX IF NOT EXISTS entries_parent ON entries (account, parent, name)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS entries_name ON entries (account, name COLLATE NOCASE)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS state (account TEXT PRIMARY KEY, refreshed_at REAL, '
+                             'full_at REAL)')
+            try:
+                self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5(name, content='entries', "
+                                 "content_rowid='id', tokenize='trigram')")
+            except sqlite3.OperationalError:  # SQLite 3.34 之前或未编译 FTS5：子串搜索退回逐条扫描
+                pass
+            else:
+                self.trigram = True
+                self._db.execute('CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN '
+                                 'INSERT INTO names (rowid, name) VALUES (new.id, new.name); END')
+                self._db.execute("CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN "
+                                 "INSERT INTO names (names, rowid, name) VALUES ('delete', old.id, old.name); END")
+                self._db.execute("CREATE TRIGGER IF NOT EXISTS entries_rename AFTER UPDATE OF name ON entries "
+                                 "WHEN old.name IS NOT new.name BEGIN "
+                                 "INSERT INTO names (names, rowid, name) VALUES ('delete', old.id, old.name); "
+                                 "INSERT INTO names (rowid, name) VALUES (new.id, new.name); END")
+        return self._db
+
+    def state(self, account: str) -> Union[dict[str, float], None]:
+        """When the index of ``account`` was last refreshed and last fully walked, None before the first refresh."""
+        if not self.enabled:
+            return None
+        row = self.db.execute('SELECT refreshed_at, full_at FROM state WHERE account = ?', (account,)).fetchone()
+        return dict(row) if row else None
+
+    async def refresh(self, account: str, list_dir: Callable[[str], Awaitable[list[dict[str, Any]]]],
+                      workers: int = 4, full: Union[bool, None] = None) -> dict[str, int]:
+        """
+        Walk the drive from the root with ``workers`` concurrent listings and store what changed. Unless ``full``
+        (by default: once ``full_interval`` has passed since the last full walk), folders whose ``updated_at`` is
+        the one they were last listed with are not listed again, so an interrupted first walk also resumes.
+        Returns the number of folders listed, left unchanged and failed, and of entries removed.
+        """
+        state = self.state(account)
+        if full is None:
+            full = state is not None and time.time() - state['full_at'] > self.full_interval
+        listed: dict[str, int] = {} if full else dict(self.db.execute(
+            'SELECT fid, listed FROM entries WHERE account = ? AND is_dir = 1 AND listed IS NOT NULL', (account,)))
+        stamps: dict[str, int] = {}
+        stats = dict.fromkeys(('listed', 'unchanged', 'failed', 'removed'), 0)
+
+        def descend(entry: dict[str, Any]) -> bool:
+            updated_at = int(entry.get('updated_at') or 0)
+            if listed.get(entry['fid']) == updated_at:
+                stats['unchanged'] += 1
+                return False
+            stamps[entry['fid']] = updated_at
+            return True
+
+        started = time.time()
+        async for folder in walk_tree(list_dir, [('0', '')], workers=workers, descend=descend):
+            if folder.error is not None:
+                stats['failed'] += 1
+                continue
+            removed = self._store(account, folder.fid, folder.entries, stamps.pop(folder.fid, None))
+            for fid in removed:
+                listed.pop(fid, None)  # 被移走的文件夹若在别处重新出现，需要重新列出
+            stats['listed'] += 1
+            stats['removed'] += len(removed)
+        complete = (full or state is None) and not stats['failed']
+        self.db.execute('INSERT INTO state (account, refreshed_at, full_at) VALUES (?, ?, ?) ON CONFLICT (account) '
+                        'DO UPDATE SET refreshed_at = excluded.refreshed_at, '
+                        'full_at = CASE WHEN ? THEN excluded.full_at ELSE full_at END',
+                        (account, started, started if complete else 0.0, complete))
+        return stats
+
+    def _store(self, account: str, parent: str, entries: list[dict[str, Any]],
+               listed: Union[int, None]) -> list[str]:
+        """Replace the children of ``parent`` with a fresh listing; returns the fids removed with their subtrees."""
+        rows = []
+        for item in entries:
+            is_dir = bool(item.get('dir', item.get('file_type') == 0))
+            size = int((item.get('include_items') if is_dir else item.get('size')) or 0)
+            rows.append((account, item['fid'], parent, item['file_name'], int(is_dir), size,
+                         int(item.get('updated_at') or 0)))
+        with self.db:
+            self.db.execute('BEGIN')
+            gone = {fid for (fid,) in self.db.execute('SELECT fid FROM entries WHERE account = ? AND parent = ?',
+                                                      (account, parent))} - {row[1] for row in rows}
+            self.db.executemany('INSERT INTO entries (account, fid, parent, name, is_dir, size, updated_at) '
+                                'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (account, fid) DO UPDATE SET '
+                                'parent = excluded.parent, name = excluded.name, is_dir = excluded.is_dir, '
+                                'size = excluded.size, updated_at = excluded.updated_at', rows)
+            removed = []
+            for fid in gone:
+                removed.extend(fid for (fid,) in self.db.execute(
+                    'WITH RECURSIVE subtree (fid) AS (VALUES (?) UNION SELECT e.fid FROM entries e '
+                    'JOIN subtree ON e.account = ? AND e.parent = subtree.fid) SELECT fid FROM subtree',
+                    (fid, account)))
+            self.db.executemany('DELETE FROM entries WHERE account = ? AND fid = ?',
+                                [(account, fid) for fid in removed])
+            if listed is not None:
+                self.db.execute('UPDATE entries SET listed = ? WHERE account = ? AND fid = ?',
+                                (listed, account, parent))
+        return removed
+
+    def get(self, account: str, fid: str) -> Union[dict[str, Any], None]:
+        row = self.db.execute(f'SELECT {COLUMNS} FROM entries WHERE account = ? AND fid = ?', (account, fid)).fetchone()
+        return dict(row) if row else None
+
+    def children(self, account: str, parent: str = '0', dirs_only: bool = False) -> list[dict[str, Any]]:
+        where = ' AND is_dir = 1' if dirs_only else ''
+        return [dict(row) for row in self.db.execute(
+            f'SELECT {COLUMNS} FROM entries WHERE account = ? AND parent = ?{where} ORDER BY name', (account, parent))]
+
+    def search(self, account: str, text: str, prefix: bool = False, dirs_only: bool = False,
+               limit: int = 50) -> list[dict[str, Any]]:
+        """
+        Entries whose name starts with ``text``, or with ``prefix`` false contains it, ignoring case; names that
+        start with it come first.
+        """
+        text = text.strip()
+        if not text or limit <= 0:
+            return []
+        where = ' AND is_dir = 1' if dirs_only else ''
+        rows = [dict(row) for row in self.db.execute(
+            f'SELECT {COLUMNS} FROM entries WHERE account = ? AND name >= ? COLLATE NOCASE '
+            f'AND name < ? COLLATE NOCASE{where} ORDER BY name COLLATE NOCASE LIMIT ?',
+            (account, text, text + '\U0010ffff', limit))]
+        if prefix or len(rows) >= limit:
+            return rows
+        if self.trigram and len(text) >= 3:
+            query = (f'SELECT {", ".join(f"e.{column}" for column in COLUMNS.split(", "))} FROM names '
+                     f'CROSS JOIN entries e ON e.id = names.rowid WHERE names MATCH ? AND e.account = ?{where} LIMIT ?')
+            params = ('"' + text.replace('"', '""') + '"', account, limit + len(rows))
+        else:
+            query = f'SELECT {COLUMNS} FROM entries WHERE account = ? AND instr(lower(name), ?) > 0{where} LIMIT ?'
+            params = (account, text.lower(), limit + len(rows))
+        seen = {row['fid'] for row in rows}
+        matches = [dict(row) for row in self.db.execute(query, params) if row['fid'] not in seen]
+        return rows + sorted(matches, key=lambda row: (len(row['name']), row['name']))[:limit - len(rows)]
+
+    def path_of(self, account: str, fid: str) -> Union[str, None]:
+        """Path of an entry from the drive root, '' for the root itself, None if it is not indexed."""
+        names = []
+        while fid != '0':
+            row = self.db.execute('SELECT parent, name FROM entries WHERE account = ? AND fid = ?',
+                                  (account, fid)).fetchone()
+            if row is None:
+                return None
+            fid = row['parent']
+            names.append(row['name'])
+        return '/'.join(reversed(names))
+
+    def resolve(self, account: str, path: str) -> Union[str, None]:
+        """Fid of the entry at ``path`` ('a/b/c', relative to the drive root), None if it is not indexed."""
+        fid = '0'
+        for name in filter(None, path.strip().split('/')):
+            row = self.db.execute('SELECT fid FROM entries WHERE account = ? AND parent = ? AND name = ?',
+                                  (account, fid, name)).fetchone()
+            if row is None:
+                return None
+            fid = row['fid']
+        return fid
+
+    def count(self, account: str) -> int:
+        return self.db.execute('SELECT COUNT(*) FROM entries WHERE account = ?', (account,)).fetchone()[0]
+
+    def clear(self, account: Union[str, None] = None) -> None:
+        if account:
+            self.db.execute('DELETE FROM entries WHERE account = ?', (account,))
+            self.db.execute('DELETE FROM state WHERE account = ?', (account,))
+        else:
+            self.db.execute('DELETE FROM entries')
+            self.db.execute('DELETE FROM state')
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,104 @@
+import sqlite3
+import time
+from typing import Any, Union
+
+from quark_login import CONFIG_DIR
+from utils import open_db
+
+PENDING = 'pending'
+STOKEN_OK = 'stoken_ok'
+SAVING = 'saving'
+DONE = 'done'
+FAILED = 'failed'
+STATES = (PENDING, STOKEN_OK, SAVING, DONE, FAILED)
+
+
+class TransferJournal:
+    """
+    Durable record of share-link transfers, one row per link in ``transfer_journal.db``.
+
+    Every link is keyed by account, target folder and URL and moves through pending → stoken_ok → saving (the save
+    task id is known) → done, or ends as failed with the API code and message. Each change is committed
+    immediately, so after a crash a re-run knows which links are finished and which save tasks are still to be
+    polled, and ``summary``/``jobs`` report progress without touching the API.
+    """
+
+    def __init__(self, path: str = f'{CONFIG_DIR}/transfer_journal.db', enabled: bool = True) -> None:
+        self.path = path
+        self.enabled = enabled
+        self._db: Union[sqlite3.Connection, None] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = open_db(self.path)
+            self._db.execute('CREATE TABLE IF NOT EXISTS jobs (account TEXT, folder_id TEXT, url TEXT, state TEXT, '
+                             'task_id TEXT, code INTEGER, message TEXT, attempts INTEGER DEFAULT 0, '
+                             'created_at REAL, updated_at REAL, PRIMARY KEY (account, folder_id, url))')
+            self._db.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (account, state)')
+        return self._db
+
+    def add(self, account: str, folder_id: str, urls: list[str]) -> None:
+        """Register links as pending unless they are already known."""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self.db:
+            self.db.execute('BEGIN')
+            self.db.executemany('INSERT OR IGNORE INTO jobs (account, folder_id, url, state, created_at, updated_at) '
+                                'VALUES (?, ?, ?, ?, ?, ?)',
+                                [(account, folder_id, url, PENDING, now, now) for url in urls])
+
+    def get(self, account: str, folder_id: str, url: str) -> Union[dict[str, Any], None]:
+        if not self.enabled:
+            return None
+        row = self.db.execute('SELECT * FROM jobs WHERE account = ? AND folder_id = ? AND url = ?',
+                              (account, folder_id, url)).fetchone()
+        return dict(row) if row else None
+
+    def update(self, account: str, folder_id: str, url: str, state: str, task_id: Union[str, None] = None,
+               code: Union[int, None] = None, message: str = '') -> None:
+        """Move a link to ``state``; entering pending counts as a new attempt and clears the last task and error."""
+        if not self.enabled:
+            return
+        now = time.time()
+        if state == PENDING:
+            self.db.execute('INSERT INTO jobs (account, folder_id, url, state, attempts, created_at, updated_at) '
+                            'VALUES (?, ?, ?, ?, 1, ?, ?) ON CONFLICT (account, folder_id, url) DO UPDATE SET '
+                            'state = excluded.state, task_id = NULL, code = NULL, message = NULL, '
+                            'attempts = attempts + 1, updated_at = excluded.updated_at',
+                            (account, folder_id, url, state, now, now))
+        else:
+            self.db.execute('UPDATE jobs SET state = ?, task_id = COALESCE(?, task_id), code = ?, message = ?, '
+                            'updated_at = ? WHERE account = ? AND folder_id = ? AND url = ?',
+                            (state, task_id, code, message, now, account, folder_id, url))
+
+    def summary(self, account: Union[str, None] = None) -> dict[str, int]:
+        counts = dict.fromkeys(STATES, 0)
+        query = 'SELECT state, COUNT(*) FROM jobs' + (' WHERE account = ?' if account else '') + ' GROUP BY state'
+        for state, count in self.db.execute(query, (account,) if account else ()):
+            counts[state] = count
+        return counts
+
+    def jobs(self, account: Union[str, None] = None,
+             states: Union[tuple[str, ...], None] = None) -> list[dict[str, Any]]:
+        conditions, params = [], []
+        if account:
+            conditions.append('account = ?')
+            params.append(account)
+        if states:
+            conditions.append(f'state IN ({", ".join("?" * len(states))})')
+            params.extend(states)
+        where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+        return [dict(row) for row in self.db.execute(f'SELECT * FROM jobs{where} ORDER BY created_at, url', params)]
+
+    def clear(self, account: Union[str, None] = None) -> None:
+        if account:
+            self.db.execute('DELETE FROM jobs WHERE account = ?', (account,))
+        else:
+            self.db.execute('DELETE FROM jobs')
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
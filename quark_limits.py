@@ -0,0 +1,119 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Union
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: ``rate`` acquisitions per second on average, with up to ``burst`` at once.
+
+    Waiters are served in arrival order. A ``rate`` of 0 disables the limit.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on the number of requests in flight.
+
+    Every healthy response raises the limit by ``increase / limit``, about ``increase`` per round of requests, up to
+    ``max_limit``. A throttled response (429, 5xx, a rate-limit code), a timeout or a latency above
+    ``latency_factor`` times the moving average multiplies it by ``decrease``, at most once per ``cooldown``
+    seconds (by default once per average latency, i.e. once per round) and never below ``min_limit``. Decreases are
+    logged through ``log``; increases only once the limit has doubled since it was last logged, or reaches
+    ``max_limit``.
+    """
+
+    def __init__(self, initial: int = 16, min_limit: int = 1, max_limit: int = 64, increase: float = 1.0,
+                 decrease: float = 0.7, latency_factor: float = 4.0, cooldown: Union[float, None] = None,
+                 warmup: int = 20, log: Callable[[str], Any] = print) -> None:
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.warmup = warmup
+        self.log = log
+        self.in_flight = 0
+        self.latency: Union[float, None] = None
+        self._samples = 0
+        self._decreased_at = float('-inf')
+        self._logged = int(self.limit)
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                self.release()  # 已分配到名额但调用方被取消
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def on_success(self, latency: float) -> None:
+        self._samples += 1
+        if self.latency is None:
+            self.latency = latency
+        average = self.latency
+        self.latency += 0.1 * (latency - self.latency)
+        if self._samples > self.warmup and latency > self.latency_factor * average:
+            self.on_congestion(f'延迟 {latency * 1000:.0f}ms，为平均值的 {latency / average:.1f} 倍')
+            return
+        old = int(self.limit)
+        self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+        new = int(self.limit)
+        if new > old:
+            if new >= 2 * self._logged or new == self.max_limit:
+                self.log(f'并发上限 {self._logged} → {new}（请求正常，平均延迟 {self.latency * 1000:.0f}ms）')
+                self._logged = new
+            self._wake()
+
+    def on_congestion(self, reason: str) -> None:
+        now = time.monotonic()
+        cooldown = self.cooldown if self.cooldown is not None else self.latency or 0.0
+        if now - self._decreased_at < cooldown:
+            return
+        self._decreased_at = now
+        old = int(self.limit)
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+        self._logged = int(self.limit)
+        self.log(f'并发上限 {old} → {self._logged}（{reason}）')
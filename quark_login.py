@@ -1,8 +1,7 @@
+import ast
 import os
 import time
 from typing import Dict, Union, List
-from playwright.sync_api import sync_playwright
-from retrying import retry
 
 CONFIG_DIR = './config'
 os.makedirs(CONFIG_DIR, exist_ok=True)
@@ -21,8 +20,19 @@ class QuarkLogin:
         with open(f'{CONFIG_DIR}/cookies.txt', 'w', encoding='utf-8') as f:
             f.write(str(cookie))
 
-    @retry
-    def login(self) -> None:
+    def login(self, attempts: int = 3) -> None:
+        for attempt in range(1, attempts + 1):
+            try:
+                return self._login()
+            except Exception as e:
+                if attempt >= attempts:
+                    raise
+                print(f"登录失败：{e!r}，正在重试（第{attempt}次）")
+                time.sleep(2 ** attempt)
+
+    def _login(self) -> None:
+        # 只有需要扫码登录时才导入 Playwright，已保存 Cookie 时启动无需加载浏览器相关模块
+        from playwright.sync_api import sync_playwright
 
         # print("正在进行Playwright初始化...")
         # os.environ['PLAYWRIGHT_BROWSERS_PATH'] = '0'
@@ -72,7 +82,7 @@ class QuarkLogin:
                 content = f.read()
 
             if content and '[' in content:
-                saved_cookies = eval(content)
+                saved_cookies = ast.literal_eval(content)
                 cookies_dict = self.transfer_cookies(saved_cookies)
                 timestamp = int(time.time())
                 if 'expires' in cookies_dict and timestamp > int(cookies_dict['expires']):
@@ -92,7 +102,7 @@ class QuarkLogin:
                 content = f.read()
                 if not content:
                     return
-                saved_cookies = eval(content)
+                saved_cookies = ast.literal_eval(content)
             cookies_dict = self.transfer_cookies(saved_cookies)
             return self.dict_to_cookie_str(cookies_dict)
 
@@ -0,0 +1,152 @@
+import bisect
+import json
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Union
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout, with bucket-interpolated quantiles."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """
+    Counters for API requests (latency, status and Quark error code per endpoint) and file downloads.
+
+    ``write`` exports a Prometheus text file when the path ends in ``.prom`` and a JSON snapshot otherwise.
+    """
+
+    code_pattern = re.compile(rb'"code"\s*:\s*(-?\d+)')
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.latency: dict[str, Histogram] = {}
+        self.requests: Counter[tuple[str, str]] = Counter()
+        self.errors: Counter[tuple[str, str]] = Counter()
+        self.download_bytes = 0
+        self.files: Counter[str] = Counter()
+
+    @classmethod
+    def error_code(cls, status_code: int, content: bytes) -> Union[str, None]:
+        """The Quark error code of a response, read from the start of the body without parsing all of it."""
+        match = cls.code_pattern.search(content[:512])
+        if match and match.group(1) != b'0':
+            return match.group(1).decode()
+        if status_code >= 400:
+            return f'HTTP {status_code}'
+        return None
+
+    def observe_request(self, endpoint: str, latency: float, status: str, code: Union[str, None] = None) -> None:
+        histogram = self.latency.get(endpoint)
+        if histogram is None:
+            histogram = self.latency[endpoint] = Histogram()
+        histogram.observe(latency)
+        self.requests[endpoint, status] += 1
+        if code is not None:
+            self.errors[endpoint, code] += 1
+
+    def observe_bytes(self, size: int) -> None:
+        self.download_bytes += size
+
+    def observe_file(self, ok: bool) -> None:
+        self.files['ok' if ok else 'failed'] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        uptime = max(time.monotonic() - self.started, 1e-9)
+        endpoints = {}
+        for endpoint, histogram in sorted(self.latency.items()):
+            endpoints[endpoint] = {
+                'count': histogram.count,
+                'mean': histogram.sum / histogram.count,
+                'p50': histogram.quantile(0.5),
+                'p90': histogram.quantile(0.9),
+                'p99': histogram.quantile(0.99),
+                'status': {status: n for (name, status), n in self.requests.items() if name == endpoint},
+                'errors': {code: n for (name, code), n in self.errors.items() if name == endpoint},
+            }
+        return {
+            'time': time.time(),
+            'uptime': uptime,
+            'endpoints': endpoints,
+            'downloads': {
+                'bytes': self.download_bytes,
+                'files': self.files['ok'],
+                'failed': self.files['failed'],
+                'bytes_per_second': self.download_bytes / uptime,
+                'files_per_second': self.files['ok'] / uptime,
+            },
+        }
+
+    def to_prometheus(self) -> str:
+        uptime = max(time.monotonic() - self.started, 1e-9)
+        lines = ['# HELP quark_request_duration_seconds API request latency by endpoint.',
+                 '# TYPE quark_request_duration_seconds histogram']
+        for endpoint, histogram in sorted(self.latency.items()):
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, '+Inf'), histogram.counts):
+                cumulative += count
+                lines.append(f'quark_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} '
+                             f'{cumulative}')
+            lines.append(f'quark_request_duration_seconds_sum{{endpoint="{endpoint}"}} {histogram.sum}')
+            lines.append(f'quark_request_duration_seconds_count{{endpoint="{endpoint}"}} {histogram.count}')
+        lines += ['# HELP quark_requests_total API requests by endpoint and HTTP status.',
+                  '# TYPE quark_requests_total counter']
+        lines += [f'quark_requests_total{{endpoint="{endpoint}",status="{status}"}} {n}'
+                  for (endpoint, status), n in sorted(self.requests.items())]
+        lines += ['# HELP quark_api_errors_total API errors by endpoint and Quark error code.',
+                  '# TYPE quark_api_errors_total counter']
+        lines += [f'quark_api_errors_total{{endpoint="{endpoint}",code="{code}"}} {n}'
+                  for (endpoint, code), n in sorted(self.errors.items())]
+        lines += ['# HELP quark_download_bytes_total Bytes written by file downloads.',
+                  '# TYPE quark_download_bytes_total counter',
+                  f'quark_download_bytes_total {self.download_bytes}',
+                  '# HELP quark_download_files_total Finished file downloads by result.',
+                  '# TYPE quark_download_files_total counter',
+                  f'quark_download_files_total{{result="ok"}} {self.files["ok"]}',
+                  f'quark_download_files_total{{result="failed"}} {self.files["failed"]}',
+                  '# HELP quark_download_bytes_per_second Average download throughput since start.',
+                  '# TYPE quark_download_bytes_per_second gauge',
+                  f'quark_download_bytes_per_second {self.download_bytes / uptime}',
+                  '# HELP quark_download_files_per_second Average downloaded files per second since start.',
+                  '# TYPE quark_download_files_per_second gauge',
+                  f'quark_download_files_per_second {self.files["ok"] / uptime}']
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str) -> None:
+        if path.endswith('.prom'):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
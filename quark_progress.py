@@ -0,0 +1,223 @@
+import asyncio
+import heapq
+import json
+import shutil
+import sys
+import time
+import unicodedata
+from typing import Any, TextIO, Union
+
+from utils import custom_print
+
+MODES = ('auto', 'tty', 'plain', 'json', 'off')
+
+
+def format_size(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if abs(size) < 1024 or unit == 'TiB':
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TiB'
+
+
+def fit(text: str, width: int) -> str:
+    """Cut ``text`` to ``width`` terminal columns, counting East Asian wide characters as two."""
+    columns = 0
+    for i, char in enumerate(text):
+        columns += 2 if unicodedata.east_asian_width(char) in 'WF' else 1
+        if columns > width:
+            return text[:max(0, i - 1)] + '…'
+    return text
+
+
+class Transfer:
+    """One file being downloaded; ``update`` is the only call made per chunk."""
+
+    __slots__ = ('reporter', 'name', 'total', 'done', 'started')
+
+    def __init__(self, reporter: 'ProgressReporter', name: str, total: Union[int, None], done: int = 0) -> None:
+        self.reporter = reporter
+        self.name = name
+        self.total = total
+        self.done = done
+        self.started = time.monotonic()
+
+    def update(self, size: int) -> None:
+        self.done += size
+        self.reporter.bytes += size
+
+    @property
+    def remaining(self) -> int:
+        return (self.total or 0) - self.done
+
+
+class _Console:
+    """Stand-in for stdout while a progress block is drawn: erases the block before anything else is printed."""
+
+    def __init__(self, reporter: 'ProgressReporter', stream: TextIO) -> None:
+        self._reporter = reporter
+        self._stream = stream
+
+    def write(self, text: str) -> int:
+        self._reporter.erase()
+        self._reporter.at_line_start = text.endswith('\n') if text else self._reporter.at_line_start
+        return self._stream.write(text)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class ProgressReporter:
+    """
+    One progress display for all downloads of a run, in place of a progress bar per file.
+
+    Transfers only add to counters; a render task draws the totals (files done and failed, bytes, speed) every
+    ``interval`` seconds, with a line for each of the ``top`` active transfers that have the most bytes left. On a
+    terminal the block is redrawn in place and stdout is redirected so that other messages print above it;
+    otherwise (``mode`` plain or json, or auto without a TTY) a summary line is printed every ``log_interval``
+    seconds. ``off`` keeps counting but prints nothing. A run lasts from entering the reporter as an async context
+    manager to leaving it, which prints the final totals and resets the counters; ``expect`` may be called before,
+    and runs entered while another one is active join it.
+    """
+
+    def __init__(self, mode: str = 'auto', interval: float = 0.2, log_interval: float = 10.0, top: int = 5,
+                 stream: Union[TextIO, None] = None) -> None:
+        if mode not in MODES:
+            raise ValueError(f'未知的进度显示方式：{mode}，可选 {"/".join(MODES)}')
+        self.stream = stream
+        if mode == 'auto':
+            output = stream or sys.stdout
+            mode = 'tty' if hasattr(output, 'isatty') and output.isatty() else 'plain'
+        self.mode = mode
+        self.interval = interval if mode == 'tty' else log_interval
+        self.top = max(0, top)
+        self.active: set[Transfer] = set()
+        self.files_total = 0
+        self.files_done = 0
+        self.files_failed = 0
+        self.bytes = 0
+        self.speed = 0.0
+        self.at_line_start = True
+        self._lines = 0
+        self._started = 0.0
+        self._sampled = (0.0, 0)
+        self._runs = 0
+        self._task: Union[asyncio.Task, None] = None
+        self._stdout: Union[TextIO, None] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'off'
+
+    def expect(self, files: int = 1) -> None:
+        self.files_total += files
+
+    def begin(self, name: str, total: Union[int, None], done: int = 0) -> Transfer:
+        transfer = Transfer(self, name, total, done)
+        self.active.add(transfer)
+        return transfer
+
+    def end(self, transfer: Transfer) -> None:
+        self.active.discard(transfer)
+
+    def finish(self, ok: bool) -> None:
+        if ok:
+            self.files_done += 1
+        else:
+            self.files_failed += 1
+
+    def status(self) -> dict[str, Any]:
+        now = time.monotonic()
+        sampled_at, sampled_bytes = self._sampled
+        if now - sampled_at >= 1.0:  # 速度按至少 1 秒的窗口计算，避免高刷新率下抖动
+            rate = (self.bytes - sampled_bytes) / (now - sampled_at)
+            self.speed = rate if not self.speed else 0.5 * self.speed + 0.5 * rate
+            self._sampled = (now, self.bytes)
+        return {
+            'time': round(time.time(), 3),
+            'elapsed': round(now - self._started, 3),
+            'files_done': self.files_done,
+            'files_failed': self.files_failed,
+            'files_total': self.files_total,
+            'active': len(self.active),
+            'bytes': self.bytes,
+            'speed': round(self.speed),
+        }
+
+    def summary(self, status: dict[str, Any]) -> str:
+        return (f'下载进度：{status["files_done"]}/{status["files_total"]} 个文件，失败 {status["files_failed"]}，'
+                f'{format_size(status["bytes"])}，{format_size(status["speed"])}/s，进行中 {status["active"]}')
+
+    def lines(self, status: dict[str, Any]) -> list[str]:
+        lines = [self.summary(status)]
+        now = time.monotonic()
+        for transfer in heapq.nlargest(self.top, self.active, key=lambda t: t.remaining):
+            speed = transfer.done / max(now - transfer.started, 1e-3)
+            percent = f'{transfer.done * 100 // transfer.total:3d}%' if transfer.total else '   ?'
+            total = format_size(transfer.total) if transfer.total else '?'
+            lines.append(f'  {percent} {format_size(transfer.done)}/{total} {format_size(speed)}/s  {transfer.name}')
+        return lines
+
+    def erase(self) -> None:
+        if self._lines:
+            stream = self._stdout or self.stream or sys.stdout
+            stream.write((f'\x1b[{self._lines - 1}F' if self._lines > 1 else '\r') + '\x1b[J')
+            self._lines = 0
+
+    def render(self) -> None:
+        status = self.status()
+        if self.mode == 'tty':
+            self.erase()
+            width = shutil.get_terminal_size().columns - 1
+            lines = [fit(line, width) for line in self.lines(status)]
+            stream = self._stdout or self.stream or sys.stdout
+            stream.write(('' if self.at_line_start else '\n') + '\n'.join(lines))
+            stream.flush()
+            self.at_line_start = True
+            self._lines = len(lines)
+        elif self.mode == 'json':
+            print(json.dumps(status), file=self.stream, flush=True)
+        elif self.mode == 'plain':
+            custom_print(self.summary(status))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.render()
+
+    def reset(self) -> None:
+        self.files_total = self.files_done = self.files_failed = self.bytes = 0
+        self.speed = 0.0
+        self.active.clear()
+
+    async def __aenter__(self) -> 'ProgressReporter':
+        self._runs += 1
+        if self._runs > 1:
+            return self
+        self._started = time.monotonic()
+        self._sampled = (self._started, 0)
+        if self.mode == 'tty' and self.stream is None:
+            self._stdout, sys.stdout = sys.stdout, _Console(self, sys.stdout)
+        if self.enabled:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._runs -= 1
+        if self._runs:
+            return
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.enabled:
+            now = time.monotonic()
+            self.speed = self.bytes / max(now - self._started, 1e-3)  # 结束时显示全程平均速度
+            self._sampled = (now, self.bytes)
+            self.render()
+            if self.mode == 'tty':
+                (self._stdout or self.stream or sys.stdout).write('\n')
+                self._lines = 0
+        if self._stdout is not None:
+            sys.stdout, self._stdout = self._stdout, None
+        self.reset()
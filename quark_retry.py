@@ -0,0 +1,90 @@
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, TypeVar, Union
+
+import httpx
+
+from utils import QuarkApiError
+
+T = TypeVar('T')
+
+TRANSIENT = 'transient'
+THROTTLED = 'throttled'
+AUTH_EXPIRED = 'auth_expired'
+PERMANENT = 'permanent'
+
+
+class RetryPolicy:
+    """
+    Classifies failures and decides whether, and after how long, to retry them.
+
+    ``policies`` maps each class to ``(max attempts, base delay, max delay)``; the n-th retry sleeps a random time
+    between 0 and ``min(max delay, base delay * 2 ** (n - 1))`` (full jitter). Permanent failures such as a full
+    drive (32003), a missing target folder (41013) or a removed share (23008) and expired logins are not retried.
+    """
+
+    permanent_codes: frozenset[int] = frozenset({23008, 32003, 41013})
+    auth_codes: frozenset[int] = frozenset({401, 31001})
+    throttle_codes: frozenset[int] = frozenset({429})
+
+    def __init__(self, policies: Union[dict[str, tuple[int, float, float]], None] = None,
+                 log: Callable[[str], Any] = print) -> None:
+        self.policies = {
+            TRANSIENT: (4, 0.5, 8.0),
+            THROTTLED: (6, 2.0, 60.0),
+            AUTH_EXPIRED: (1, 0.0, 0.0),
+            PERMANENT: (1, 0.0, 0.0),
+        }
+        self.policies.update(policies or {})
+        self.log = log
+
+    def classify_status(self, status_code: int) -> str:
+        if status_code == 429:
+            return THROTTLED
+        if status_code == 401:
+            return AUTH_EXPIRED
+        if status_code >= 500:
+            return TRANSIENT
+        return PERMANENT
+
+    def classify(self, error: BaseException) -> str:
+        if isinstance(error, QuarkApiError):
+            if error.code in self.permanent_codes:
+                return PERMANENT
+            if error.code in self.auth_codes:
+                return AUTH_EXPIRED
+            if error.code in self.throttle_codes or '频繁' in str(error.message):
+                return THROTTLED
+            if error.code is None or (isinstance(error.code, int) and 500 <= error.code < 600):
+                return TRANSIENT
+            return PERMANENT
+        if isinstance(error, httpx.HTTPStatusError):
+            return self.classify_status(error.response.status_code)
+        if isinstance(error, (httpx.TransportError, asyncio.TimeoutError, TimeoutError, ConnectionError, ValueError)):
+            return TRANSIENT  # ValueError：网关返回了非 JSON 的错误页
+        return PERMANENT
+
+    def delay(self, kind: str, attempt: int) -> Union[float, None]:
+        """Seconds to wait before retrying after failed attempt ``attempt`` of class ``kind``, None to give up."""
+        max_attempts, base, cap = self.policies[kind]
+        if attempt >= max_attempts:
+            return None
+        return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+    def backoff(self, error: BaseException, attempt: int) -> Union[float, None]:
+        return self.delay(self.classify(error), attempt)
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args, description: str = '', **kwargs) -> T:
+        """Await ``func(*args, **kwargs)``, retrying it as long as the policy of each failure allows."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                kind = self.classify(e)
+                delay = self.delay(kind, attempt)
+                if delay is None:
+                    raise
+                self.log(f'{description}失败（{kind}，第{attempt}次）：{e!r}，{delay:.1f}秒后重试')
+                await asyncio.sleep(delay)
@@ -0,0 +1,28 @@
+import time
+from typing import Union
+
+
+class QuarkSession:
+    """
+    Account name and selected save folder of the running program, plus when the cookies were last confirmed.
+
+    The session is fresh for ``ttl`` seconds after ``validated``; ``invalidate`` (after an auth error, a login or a
+    folder switch) makes the next ``load_folder_id`` ask the server again.
+    """
+
+    def __init__(self, ttl: float = 1800.0) -> None:
+        self.ttl = ttl
+        self.user: Union[str, None] = '用户A'
+        self.pdir_id: Union[str, None] = '0'
+        self.dir_name: Union[str, None] = '根目录'
+        self.validated_at = float('-inf')
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() - self.validated_at < self.ttl
+
+    def validated(self) -> None:
+        self.validated_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self.validated_at = float('-inf')
@@ -0,0 +1,107 @@
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, Union
+
+from utils import QuarkApiError
+
+
+class TaskPoller:
+    """
+    Polls ``/clouddrive/task`` for any number of outstanding task ids from a single loop.
+
+    Each task id waited on gets its own future and its own backoff: the first poll happens after about
+    ``initial_delay`` seconds and every unfinished poll multiplies the delay by ``factor`` up to ``max_delay``,
+    jittered between half and the full delay so that tasks submitted together do not poll in lockstep. The default
+    ``max_delay`` of one second is the pace of the per-task polling loops this replaces: a longer one saves polls
+    but notices finished tasks later and makes batches slower end to end. A task resolves with the response of the
+    poll that reports status 2, fails with QuarkApiError when the API returns an error and with TimeoutError after
+    ``max_polls`` unfinished polls.
+    """
+
+    def __init__(self, fetch: Callable[[str, int], Awaitable[dict[str, Any]]], initial_delay: float = 0.5,
+                 max_delay: float = 1.0, factor: float = 1.3, max_polls: int = 50) -> None:
+        self.fetch = fetch
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.max_polls = max_polls
+        self._tasks: dict[str, dict[str, Any]] = {}
+        self._runner: Union[asyncio.Task, None] = None
+        self._wakeup: Union[asyncio.Event, None] = None
+
+    @staticmethod
+    def jitter(delay: float) -> float:
+        return random.uniform(delay / 2, delay)
+
+    async def wait(self, task_id: str, max_polls: Union[int, None] = None) -> dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(task_id)
+        if task is None:
+            task = self._tasks[task_id] = {
+                'future': loop.create_future(),
+                'polls': 0,
+                'max_polls': max_polls or self.max_polls,
+                'delay': self.initial_delay,
+                'due': loop.time() + self.jitter(self.initial_delay),
+                'polling': False,
+            }
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+        elif self._wakeup:
+            self._wakeup.set()
+        return await task['future']
+
+    async def _poll(self, task_id: str, task: dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        future = task['future']
+        try:
+            json_data = await self.fetch(task_id, task['polls'])
+            task['polls'] += 1
+            if json_data['message'] != 'ok':
+                raise QuarkApiError(json_data['code'], json_data['message'])
+            if json_data['data']['status'] == 2:
+                if not future.done():
+                    future.set_result(json_data)
+            elif task['polls'] >= task['max_polls']:
+                raise TimeoutError(f'任务 {task_id} 在{task["polls"]}次查询后仍未完成')
+            else:
+                task['delay'] = min(self.max_delay, task['delay'] * self.factor)
+                task['due'] = loop.time() + self.jitter(task['delay'])
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            task['polling'] = False
+            if future.done():
+                self._tasks.pop(task_id, None)
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        polls: set[asyncio.Task] = set()
+        try:
+            while self._tasks:
+                self._wakeup.clear()
+                now = loop.time()
+                next_due = None
+                for task_id, task in list(self._tasks.items()):
+                    if task['future'].done():
+                        self._tasks.pop(task_id)  # 等待方已取消
+                    elif task['polling']:
+                        continue
+                    elif task['due'] <= now:
+                        task['polling'] = True
+                        poll = asyncio.create_task(self._poll(task_id, task))
+                        polls.add(poll)
+                        poll.add_done_callback(polls.discard)
+                    elif next_due is None or task['due'] < next_due:
+                        next_due = task['due']
+                timeout = None if next_due is None else next_due - now
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for poll in polls:
+                poll.cancel()
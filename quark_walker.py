@@ -0,0 +1,86 @@
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, NamedTuple, Union
+
+
+class Folder(NamedTuple):
+    fid: str
+    path: str
+    depth: int
+    entries: list[dict[str, Any]]
+    error: Union[Exception, None] = None
+
+
+def join_path(parent: str, name: str) -> str:
+    return f'{parent}/{name}' if parent else name
+
+
+async def walk_tree(list_dir: Callable[[str], Awaitable[list[dict[str, Any]]]], roots: list[tuple[str, str]],
+                    workers: int = 8, max_depth: Union[int, None] = None, ordered: bool = False,
+                    descend: Union[Callable[[dict[str, Any]], bool], None] = None) -> AsyncIterator[Folder]:
+    """
+    Walk folders breadth-first with ``workers`` concurrent listings, yielding each folder as soon as it is listed.
+
+    ``roots`` are ``(fid, relative path)`` pairs at depth 1; subfolders of a folder at ``max_depth`` are not
+    entered. Only folder fids wait in the work queue, and at most ``workers * 4`` listed folders wait for the
+    consumer, so listing pauses instead of buffering the tree when the consumer is slower. A failed listing is
+    yielded with ``error`` set and no entries. ``descend``, when given, is called once with every folder entry
+    and only the folders it returns true for are entered.
+
+    With ``ordered`` folders are still listed concurrently but yielded in breadth-first listing order, the same
+    order on every run; folders listed ahead of a slow one wait in memory until it is yielded.
+    """
+    todo: asyncio.Queue = asyncio.Queue()
+    done: asyncio.Queue = asyncio.Queue(maxsize=workers * 4)
+    for fid, path in roots:
+        todo.put_nowait((fid, path, 1))
+    entered: dict[str, list[str]] = {}
+    pending = todo.qsize()
+    if not pending:
+        return
+
+    async def worker() -> None:
+        nonlocal pending
+        while True:
+            fid, path, depth = await todo.get()
+            try:
+                entries, error = await list_dir(fid), None
+            except Exception as e:
+                entries, error = [], e
+            subfolders = []
+            if max_depth is None or depth < max_depth:
+                for entry in entries:
+                    if entry['dir'] and (descend is None or descend(entry)):
+                        todo.put_nowait((entry['fid'], join_path(path, entry['file_name']), depth + 1))
+                        subfolders.append(entry['fid'])
+                        pending += 1
+            if ordered:
+                entered[fid] = subfolders
+            await done.put(Folder(fid, path, depth, entries, error))
+            pending -= 1
+            if not pending:
+                await done.put(None)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(max(1, workers))]
+    expected = deque(fid for fid, _ in roots)
+    listed: dict[str, Folder] = {}
+    try:
+        while True:
+            folder = await done.get()
+            if not ordered:
+                if folder is None:
+                    break
+                yield folder
+                continue
+            if folder is not None:
+                listed[folder.fid] = folder
+            while expected and expected[0] in listed:
+                ready = listed.pop(expected.popleft())
+                expected.extend(entered.pop(ready.fid))
+                yield ready
+            if folder is None:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
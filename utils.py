@@ -2,6 +2,7 @@ import json
 import os
 import random
 import shutil
+import sqlite3
 import string
 import time
 from datetime import datetime
@@ -9,6 +10,13 @@ from typing import Union
 from colorama import Fore, Style
 
 
+class QuarkApiError(Exception):
+    def __init__(self, code: Union[int, None], message: str) -> None:
+        super().__init__(f'{code}: {message}')
+        self.code = code
+        self.message = message
+
+
 def get_datetime(timestamp: Union[int, float, None] = None, fmt: str = "%Y-%m-%d %H:%M:%S") -> str:
     if timestamp is None or not isinstance(timestamp, (int, float)):
         return datetime.today().strftime(fmt)
@@ -25,6 +33,16 @@ def custom_print(message, error_msg=False) -> None:
         print(f'[{get_datetime()}] {message}')
 
 
+def open_db(path: str) -> sqlite3.Connection:
+    """Open the SQLite database at ``path``, creating its folder, in autocommit mode with WAL journaling."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    db = sqlite3.connect(path, isolation_level=None)
+    db.row_factory = sqlite3.Row
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('PRAGMA synchronous=NORMAL')
+    return db
+
+
 def get_timestamp(length: int) -> int:
     if length == 13:
         return int(time.time()) * 1000